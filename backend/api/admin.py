@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import (
     User, Project, ProjectMember, Sprint, Task, Comment,
-    Attachment, ActivityLog, BehavioralEvent, TimeEntry, Notification
+    Attachment, ActivityLog, BehavioralEvent, TimeEntry, Notification, UserProductivityProfile
 )
 
 @admin.register(User)
@@ -48,3 +48,8 @@ admin.site.register(ProjectMember)
 admin.site.register(Attachment)
 admin.site.register(ActivityLog)
 admin.site.register(BehavioralEvent)
+
+@admin.register(UserProductivityProfile)
+class UserProductivityProfileAdmin(admin.ModelAdmin):
+    list_display = ['user', 'events_analyzed', 'best_hour', 'window_days', 'computed_at']
+    readonly_fields = ['computed_at']
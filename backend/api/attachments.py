@@ -0,0 +1,222 @@
+import hashlib
+import mimetypes
+import os
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from .models import ActivityLog, Attachment, AttachmentUpload
+
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def part_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', f'{upload.id}.part')
+
+
+def blob_name(sha256):
+    return f'attachments/{sha256[:2]}/{sha256}'
+
+
+def purge_stale_uploads(user, max_age=timedelta(hours=24)):
+    stale = AttachmentUpload.objects.filter(uploaded_by=user, updated_at__lt=timezone.now() - max_age)
+    for upload in stale:
+        discard_upload(upload)
+
+
+def discard_upload(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def start_part(upload):
+    path = part_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+
+class UploadBusy(Exception):
+    pass
+
+
+@contextmanager
+def locked_part(upload):
+    # One writer per upload; a second concurrent PATCH gets UploadBusy
+    # instead of interleaving bytes.
+    # r+b rather than ab: a part file that went missing must not be
+    # silently recreated and padded with zeros.
+    with open(part_path(upload), 'r+b') as part:
+        if fcntl is not None:
+            try:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadBusy
+        yield part
+
+
+def append_chunk(part, upload, stream):
+    # Copies the request body onto the end of the part file a block at a
+    # time, never past the declared size. Returns the new offset.
+    remaining = upload.size - upload.received
+    part.truncate(upload.received)
+    part.seek(upload.received)
+    while remaining > 0:
+        block = stream.read(min(BLOCK_SIZE, remaining))
+        if not block:
+            break
+        part.write(block)
+        remaining -= len(block)
+    part.flush()
+    return upload.size - remaining
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def existing_blob(sha256, size, attachments=None):
+    # Pass the caller's visible attachments when the hash comes from a
+    # client: otherwise knowing a hash would be enough to read any stored
+    # file, or to learn that it exists.
+    attachments = Attachment.objects.all() if attachments is None else attachments
+    name = attachments.filter(sha256=sha256, size=size).values_list('file', flat=True).first()
+    if name and default_storage.exists(name):
+        return name
+    return None
+
+
+def store_blob(path, sha256, size):
+    # Moves a finished file into its content-addressed location, or drops
+    # it when the same content is already stored. The bytes were received
+    # and hashed here, so any stored copy may be reused.
+    name = existing_blob(sha256, size) or blob_name(sha256)
+    target = default_storage.path(name)
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+    return name
+
+
+def create_attachment(task, user, filename, content_type, name, sha256, size):
+    with transaction.atomic():
+        attachment = Attachment.objects.create(
+            task=task,
+            file=name,
+            filename=filename,
+            content_type=content_type or mimetypes.guess_type(filename)[0] or '',
+            size=size,
+            sha256=sha256,
+            uploaded_by=user
+        )
+        ActivityLog.objects.create(
+            task=task,
+            user=user,
+            action_type='attachment_added',
+            to_value=filename[:255]
+        )
+    return attachment
+
+
+def finish_upload(upload):
+    path = part_path(upload)
+    sha256 = file_sha256(path)
+    name = store_blob(path, sha256, upload.size)
+    attachment = create_attachment(
+        upload.task, upload.uploaded_by, upload.filename, upload.content_type, name, sha256, upload.size
+    )
+    upload.delete()
+    return attachment
+
+
+def store_uploaded_file(task, user, uploaded):
+    # Single-request uploads: Django has already spooled the file (to disk
+    # above FILE_UPLOAD_MAX_MEMORY_SIZE); hash it while copying it out.
+    path = os.path.join(settings.MEDIA_ROOT, 'uploads', f'{os.urandom(16).hex()}.part')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    with open(path, 'wb') as part:
+        for block in uploaded.chunks(BLOCK_SIZE):
+            digest.update(block)
+            part.write(block)
+    sha256 = digest.hexdigest()
+    name = store_blob(path, sha256, uploaded.size)
+    return create_attachment(task, user, uploaded.name, uploaded.content_type, name, sha256, uploaded.size)
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            block = source.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def parse_range(header, size):
+    # Single byte ranges only; returns (start, end) inclusive, None for a
+    # full response, or False when the range can't be satisfied.
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def download_response(request, attachment):
+    path = default_storage.path(attachment.file.name)
+    size = os.path.getsize(path)
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    etag = f'"{attachment.sha256}"' if attachment.sha256 else None
+    if byte_range and etag and request.META.get('HTTP_IF_RANGE') not in (None, etag):
+        byte_range = None
+
+    if byte_range is False:
+        response = StreamingHttpResponse([], status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(
+        _read_range(path, start, end - start + 1),
+        status=206 if byte_range else 200,
+        content_type=attachment.content_type or 'application/octet-stream'
+    )
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(True, attachment.filename)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    if etag:
+        response['ETag'] = etag
+    return response
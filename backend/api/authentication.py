@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import is_blacklisted
+
+
+def _generation_key(user_id):
+    return f'jwt-user-gen:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.set(_generation_key(user_id), time.time_ns(), None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    # Caches the user looked up for each token jti for JWT_USER_CACHE_SECONDS.
+    # Saving a user bumps a per-user generation number, which invalidates
+    # every cached entry for that user at once.
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is not None and is_blacklisted(jti):
+            raise InvalidToken({
+                'detail': _('Given token not valid for any token type'),
+                'messages': [{'message': _('Token is blacklisted')}],
+            })
+        return validated_token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if user_id is None or jti is None:
+            return super().get_user(validated_token)
+
+        entry_key = f'jwt-user:{jti}'
+        cached = cache.get_many([_generation_key(user_id), entry_key])
+        generation = cached.get(_generation_key(user_id))
+        entry = cached.get(entry_key)
+        if generation is not None and entry is not None and entry[0] == generation:
+            user = entry[1]
+        else:
+            # A missing generation (never set, or evicted) invalidates every
+            # entry for the user, so start a new one.
+            if generation is None:
+                cache.add(_generation_key(user_id), time.time_ns(), None)
+                generation = cache.get(_generation_key(user_id))
+            user = super().get_user(validated_token)
+            cache.set(entry_key, (generation, user), getattr(settings, 'JWT_USER_CACHE_SECONDS', 60))
+
+        # Tokens outlive role changes; the cached user is always current.
+        if validated_token.get('role') != user.role:
+            validated_token['role'] = user.role
+        return user
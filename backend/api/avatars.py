@@ -0,0 +1,101 @@
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from PIL import Image, ImageOps, features
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (32, 64, 128)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='avatar-thumbnails')
+
+
+def thumbnail_sizes():
+    return getattr(settings, 'AVATAR_THUMBNAIL_SIZES', DEFAULT_SIZES)
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=80, method=4)
+    else:
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A') if image.mode == 'RGBA' else None)
+        background.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_thumbnails(source_name):
+    # {size: {format: storage name}}. Names carry a hash of the encoded bytes,
+    # so a URL never changes content and can be cached indefinitely.
+    formats = ['webp', 'jpeg'] if features.check('webp') else ['jpeg']
+    directory = posixpath.dirname(source_name)
+    with default_storage.open(source_name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    sizes = {}
+    for size in thumbnail_sizes():
+        image = ImageOps.fit(original, (size, size), Image.LANCZOS)
+        sizes[str(size)] = {}
+        for fmt in formats:
+            data = _encode(image, fmt)
+            name = posixpath.join(directory, f'{hashlib.sha256(data).hexdigest()[:16]}-{size}.{fmt}')
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(data))
+            sizes[str(size)][fmt] = name
+    return sizes
+
+
+def build_thumbnails(user_id):
+    # Only written if the avatar is still the one that was rendered, so a
+    # newer upload is never overwritten with older thumbnails.
+    from .authentication import invalidate_cached_user
+    from .directory import invalidate_user_projects
+
+    user = User.objects.filter(pk=user_id).only('avatar', 'avatar_thumbnails').first()
+    if user is None:
+        return
+    source = user.avatar.name or ''
+    previous = user.avatar_thumbnails or {}
+    thumbnails = {'source': source, 'sizes': render_thumbnails(source)} if source else {}
+    unchanged = Q(avatar=source) if source else Q(avatar='') | Q(avatar__isnull=True)
+    if not User.objects.filter(unchanged, pk=user_id).update(avatar_thumbnails=thumbnails):
+        return
+
+    current = {name for formats in thumbnails.get('sizes', {}).values() for name in formats.values()}
+    for formats in previous.get('sizes', {}).values():
+        for name in formats.values():
+            if name not in current and not User.objects.filter(avatar_thumbnails__icontains=name).exists():
+                default_storage.delete(name)
+    invalidate_cached_user(user_id)
+    invalidate_user_projects(user_id)
+
+
+def _run(user_id):
+    close_old_connections()
+    try:
+        build_thumbnails(user_id)
+    except Exception:
+        logger.exception('Building avatar thumbnails for user %s failed', user_id)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(user_id):
+    # Called on commit; image work happens on a background thread unless
+    # AVATAR_THUMBNAILS_ASYNC is off.
+    if getattr(settings, 'AVATAR_THUMBNAILS_ASYNC', True):
+        _executor.submit(_run, user_id)
+    else:
+        build_thumbnails(user_id)
+
@@ -0,0 +1,158 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from contextvars import ContextVar, copy_context
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from .db_routers import SAFE_METHODS
+from .metrics import current_request, finish_request, start_request
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Response headers a batched client may need; the rest describe the batch.
+FORWARDED_HEADERS = ('ETag', 'Last-Modified', 'Location', 'Retry-After')
+# Request headers that belong to the batch itself, not to one sub-request.
+RESERVED_HEADERS = ('AUTHORIZATION', 'CONTENT_TYPE', 'CONTENT_LENGTH')
+
+_shared = ContextVar('batch_shared', default=None)
+
+
+def shared_value(key, compute):
+    # Per-batch memo for lookups every sub-request would otherwise repeat.
+    # Returns None outside a batch, so callers keep their usual path there.
+    # Cleared after each write sub-request.
+    memo = _shared.get()
+    if memo is None:
+        return None
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+
+def parse_spec(spec):
+    if not isinstance(spec, dict):
+        raise ValueError('Each request must be an object')
+    method = spec.get('method', 'GET')
+    path = spec.get('path')
+    headers = spec.get('headers') or {}
+    if not isinstance(method, str) or method.upper() not in METHODS:
+        raise ValueError(f'method must be one of {", ".join(METHODS)}')
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        raise ValueError('path must start with /api/')
+    if not isinstance(headers, dict) or not all(
+        isinstance(name, str) and isinstance(value, str) for name, value in headers.items()
+    ):
+        raise ValueError('headers must map names to strings')
+    return {'method': method.upper(), 'path': path, 'body': spec.get('body'), 'headers': headers}
+
+
+def _subrequest(request, spec, path, query):
+    body = b'' if spec['body'] is None else json.dumps(spec['body']).encode()
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('HTTP_IF_') and key not in RESERVED_HEADERS
+    }
+    for name, value in spec['headers'].items():
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key[5:] not in RESERVED_HEADERS:
+            environ[key] = value
+    environ.update({
+        'REQUEST_METHOD': spec['method'],
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    })
+    sub = WSGIRequest(environ)
+    # DRF takes these in place of running the authenticators again.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _dispatch(request, spec):
+    path, _, query = spec['path'].partition('?')
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {'status': 404, 'body': {'error': 'Not found'}}
+    if match.url_name == 'batch':
+        return {'status': 400, 'body': {'error': 'Batches cannot be nested'}}
+
+    sub = _subrequest(request, spec, path, query)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception('Batched %s %s failed', spec['method'], spec['path'])
+        return {'status': 500, 'body': {'error': 'Internal server error'}}
+
+    # Only DRF responses carry a body here; files have to be fetched directly.
+    result = {'status': response.status_code, 'body': getattr(response, 'data', None)}
+    headers = {name: response[name] for name in FORWARDED_HEADERS if response.has_header(name)}
+    if headers:
+        result['headers'] = headers
+    return result
+
+
+def _dispatch_in_worker(request, spec):
+    # Worker threads have their own connections, so their queries are
+    # recorded separately and folded into the batch's metrics afterwards.
+    metrics, token = start_request()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            return _dispatch(request, spec), metrics
+    finally:
+        finish_request(token)
+        connections.close_all()
+
+
+def _dispatch_concurrently(request, specs):
+    parent = current_request()
+    with ThreadPoolExecutor(max_workers=min(settings.BATCH_MAX_WORKERS, len(specs))) as executor:
+        futures = [executor.submit(copy_context().run, _dispatch_in_worker, request, spec) for spec in specs]
+        results = []
+        for future in futures:
+            result, metrics = future.result()
+            if parent is not None:
+                parent.absorb(metrics)
+            results.append(result)
+    return results
+
+
+def run_batch(request, specs):
+    # Sub-requests run in order. A run of consecutive reads has no writes
+    # between them to depend on, so it may go out on BATCH_MAX_WORKERS
+    # threads; every write waits for what came before it.
+    results = []
+    token = _shared.set({})
+    try:
+        index = 0
+        while index < len(specs):
+            if specs[index]['method'] not in SAFE_METHODS:
+                results.append(_dispatch(request, specs[index]))
+                _shared.get().clear()
+                index += 1
+                continue
+            end = index
+            while end < len(specs) and specs[end]['method'] in SAFE_METHODS:
+                end += 1
+            group = specs[index:end]
+            if settings.BATCH_MAX_WORKERS > 1 and len(group) > 1:
+                results.extend(_dispatch_concurrently(request, group))
+            else:
+                results.extend(_dispatch(request, spec) for spec in group)
+            index = end
+    finally:
+        _shared.reset(token)
+    return results
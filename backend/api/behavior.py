@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ActivityLog, BehavioralEvent, UserProductivityProfile
+
+ACTIVITY_EVENTS = ['task_opened', 'status_drag_drop', 'started_timer', 'comment_added', 'task_created', 'task_completed']
+# Timer pairs longer than this are treated as a forgotten timer, not focus.
+MAX_FOCUS_SECONDS = 8 * 3600
+
+
+def _frame(queryset, columns):
+    return pd.DataFrame.from_records(list(queryset.values_list(*columns)), columns=columns)
+
+
+def _local(series):
+    return pd.to_datetime(series, utc=True).dt.tz_convert(settings.TIME_ZONE)
+
+
+def hour_of_week(events):
+    # 7 x 24 counts per user, Monday 00:00 first, in the server's TIME_ZONE.
+    activity = events[events['event_type'].isin(ACTIVITY_EVENTS)]
+    slots = activity['local'].dt.dayofweek * 24 + activity['local'].dt.hour
+    return activity.assign(slot=slots).groupby(['user_id', 'slot']).size().unstack(fill_value=0).reindex(
+        columns=range(168), fill_value=0
+    )
+
+
+def best_hours(events):
+    completed = events[events['event_type'] == 'task_completed']
+    counts = completed.assign(hour=completed['local'].dt.hour).groupby(['user_id', 'hour']).size()
+    if counts.empty:
+        return pd.Series(dtype='int64')
+    # Ties go to the earliest hour, as Counter.most_common did.
+    return counts.reset_index(name='n').sort_values(['user_id', 'n', 'hour'], ascending=[True, False, True]) \
+        .drop_duplicates('user_id').set_index('user_id')['hour']
+
+
+def focus_sessions(events):
+    # A session is a stopped_timer directly preceded by a started_timer from
+    # the same user.
+    timers = events[events['event_type'].isin(['started_timer', 'stopped_timer'])].sort_values(['user_id', 'timestamp'])
+    previous = timers.groupby('user_id')[['event_type', 'timestamp']].shift()
+    paired = (timers['event_type'] == 'stopped_timer') & (previous['event_type'] == 'started_timer')
+    seconds = (timers['timestamp'] - previous['timestamp']).dt.total_seconds()[paired]
+    seconds = seconds[(seconds > 0) & (seconds <= MAX_FOCUS_SECONDS)]
+    sessions = pd.DataFrame({'user_id': timers.loc[seconds.index, 'user_id'], 'seconds': seconds})
+    return sessions.groupby('user_id')['seconds'].agg(
+        count='count', median='median', p90=lambda s: s.quantile(0.9), longest='max', total='sum'
+    )
+
+
+def median_status_seconds(since):
+    # Time a task spent in a status is the gap between the transition into it
+    # (or task creation) and the transition out, credited to whoever made the
+    # transition out. The assignee then may have been someone else, and the
+    # log doesn't say. A task's first change in the window is measured from
+    # its last change before it, when there is one.
+    changes = ActivityLog.objects.filter(action_type='status_changed')
+    logs = _frame(
+        changes.filter(timestamp__gte=since),
+        ['task_id', 'user_id', 'task__created_at', 'from_value', 'timestamp'],
+    )
+    if logs.empty:
+        return pd.DataFrame()
+    earlier = changes.filter(
+        timestamp__lt=since, task_id__in=changes.filter(timestamp__gte=since).values('task_id')
+    ).values('task_id').annotate(last=Max('timestamp')).values_list('task_id', 'last')
+    logs = logs.sort_values(['task_id', 'timestamp'])
+    logs['timestamp'] = pd.to_datetime(logs['timestamp'], utc=True)
+    entered = logs.groupby('task_id')['timestamp'].shift()
+    entered = entered.fillna(pd.to_datetime(logs['task_id'].map(dict(earlier)), utc=True))
+    entered = entered.fillna(pd.to_datetime(logs['task__created_at'], utc=True))
+    logs['seconds'] = (logs['timestamp'] - entered).dt.total_seconds()
+    return logs[logs['seconds'] >= 0].groupby(['user_id', 'from_value'])['seconds'].median().unstack()
+
+
+def build_profiles(window_days=90, user_ids=None):
+    now = timezone.now()
+    since = now - timedelta(days=window_days)
+    queryset = BehavioralEvent.objects.filter(timestamp__gte=since)
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    events = _frame(queryset, ['user_id', 'event_type', 'timestamp'])
+    events['timestamp'] = pd.to_datetime(events['timestamp'], utc=True)
+    events['local'] = _local(events['timestamp'])
+
+    heatmaps = hour_of_week(events)
+    best = best_hours(events)
+    focus = focus_sessions(events)
+    statuses = median_status_seconds(since)
+    counts = events.groupby('user_id').size()
+
+    users = set(counts.index) | set(statuses.index)
+    if user_ids is not None:
+        users &= set(user_ids)
+
+    profiles = []
+    for user_id in users:
+        session = focus.loc[user_id] if user_id in focus.index else None
+        status_row = statuses.loc[user_id].dropna() if user_id in statuses.index else pd.Series(dtype='float64')
+        profiles.append(UserProductivityProfile(
+            user_id=int(user_id),
+            window_days=window_days,
+            events_analyzed=int(counts.get(user_id, 0)),
+            hour_of_week=[int(n) for n in heatmaps.loc[user_id]] if user_id in heatmaps.index else [0] * 168,
+            best_hour=int(best[user_id]) if user_id in best.index else None,
+            median_status_seconds={status: round(float(seconds)) for status, seconds in status_row.items()},
+            focus_sessions={
+                'count': int(session['count']),
+                'median_seconds': round(float(session['median'])),
+                'p90_seconds': round(float(session['p90'])),
+                'longest_seconds': round(float(session['longest'])),
+                'total_seconds': round(float(session['total'])),
+            } if session is not None else {'count': 0},
+            computed_at=now,
+        ))
+
+    UserProductivityProfile.objects.bulk_create(
+        profiles, batch_size=500, update_conflicts=True, unique_fields=['user'],
+        update_fields=[
+            'window_days', 'events_analyzed', 'hour_of_week', 'best_hour', 'median_status_seconds',
+            'focus_sessions', 'computed_at',
+        ],
+    )
+    return len(profiles)
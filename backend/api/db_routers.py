@@ -0,0 +1,59 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+# The replica this request reads from, picked once so every query in it
+# sees the same replication lag.
+_replica = ContextVar('replica', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def _pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(_pin_key(user.pk), False)
+
+
+def reads_from_replica(view):
+    # For read-only views that tolerate replication lag. Users who wrote
+    # something within REPLICA_PIN_SECONDS keep reading from the primary so
+    # they always see their own changes.
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = replica_aliases()
+        if request.method not in SAFE_METHODS or not replicas or _replica.get() or is_pinned(request.user):
+            return view(request, *args, **kwargs)
+        token = _replica.set(random.choice(replicas))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Upper
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import LimitOffsetPagination
+
+from .models import ProjectMember, User
+from .serializers import UserSerializer
+
+DIRECTORY_ORDERING = ('first_name', 'last_name', 'email', 'id')
+MAX_BATCH_IDS = 200
+
+
+class UserDirectoryPagination(LimitOffsetPagination):
+    default_limit = 50
+    max_limit = 200
+
+
+def parse_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ValidationError({'ids': 'Expected a comma-separated list of user ids.'})
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValidationError({'ids': f'At most {MAX_BATCH_IDS} ids per request.'})
+    return ids
+
+
+def search_terms(query):
+    return [term.lower() for term in (query or '').split()]
+
+
+def directory_users(user, projects):
+    # Users the caller may look up: themselves and everyone in one of their
+    # visible projects, never the whole organisation.
+    return User.objects.filter(
+        Q(pk=user.pk)
+        | Q(pk__in=ProjectMember.objects.filter(project__in=projects).values('user_id'))
+        | Q(pk__in=projects.values('created_by_id'))
+    )
+
+
+def _prefix_range(lookup, prefix):
+    # startswith as a range, prefix <= lookup < next prefix, which a plain
+    # btree on the expression serves on both SQLite and Postgres; LIKE alone
+    # is never matched to an expression index. startswith stays as the exact
+    # check.
+    condition = Q(**{f'{lookup}__gte': prefix, f'{lookup}__startswith': prefix})
+    if ord(prefix[-1]) < 0x10FFFF:
+        condition &= Q(**{f'{lookup}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)})
+    return condition
+
+
+def search_users(queryset, terms):
+    # Every term has to prefix-match the first name, last name or email, so
+    # "ana ko" finds Ana Kowalska. Each column is matched on its own UPPER()
+    # index; one composite index can't serve an OR across columns.
+    queryset = queryset.alias(
+        first_name_upper=Upper('first_name'), last_name_upper=Upper('last_name'), email_upper=Upper('email')
+    )
+    for term in terms:
+        term = term.upper()
+        queryset = queryset.filter(
+            _prefix_range('first_name_upper', term) | _prefix_range('last_name_upper', term)
+            | _prefix_range('email_upper', term)
+        )
+    return queryset
+
+
+def user_matches(user, terms):
+    values = [(user.get(name) or '').lower() for name in ('first_name', 'last_name', 'email')]
+    return all(any(value.startswith(term) for value in values) for term in terms)
+
+
+def _members_key(project_id):
+    return f'project-members:{project_id}'
+
+
+def project_member_users(project_id):
+    # Serialized members of a project in directory order. Kept until
+    # membership or one of the users changes.
+    key = _members_key(project_id)
+    users = cache.get(key)
+    if users is None:
+        members = User.objects.filter(projectmember__project_id=project_id).order_by(*DIRECTORY_ORDERING)
+        users = UserSerializer(members, many=True).data
+        cache.set(key, users, getattr(settings, 'PROJECT_MEMBERS_CACHE_SECONDS', 3600))
+    return users
+
+
+def invalidate_project_members(project_ids):
+    cache.delete_many([_members_key(project_id) for project_id in project_ids])
+
+
+def invalidate_user_projects(user_id):
+    invalidate_project_members(
+        ProjectMember.objects.filter(user_id=user_id).values_list('project_id', flat=True)
+    )
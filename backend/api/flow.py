@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import ActivityLog, ProcessingCheckpoint, Task, TaskStatusInterval
+
+CHECKPOINT = 'task_status_intervals'
+BATCH_SIZE = 5000
+PERCENTILES = [50, 75, 85, 95]
+STATUSES = [status for status, _ in Task.STATUS_CHOICES]
+
+
+def process_status_changes(batch_size=BATCH_SIZE):
+    # Turns status_changed logs after the checkpoint into intervals: close the
+    # task's open interval at the log time and open one for the new status.
+    # Logs younger than FLOW_PROCESSING_LAG_SECONDS wait for the next run, so
+    # rows from transactions that commit out of id order aren't skipped.
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'FLOW_PROCESSING_LAG_SECONDS', 60))
+    processed = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = ProcessingCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+            logs = list(ActivityLog.objects.filter(
+                action_type='status_changed', id__gt=checkpoint.position, timestamp__lt=cutoff
+            ).order_by('id').values_list(
+                'id', 'task_id', 'task__project_id', 'task__created_at', 'from_value', 'to_value', 'timestamp'
+            )[:batch_size])
+            if not logs:
+                break
+
+            open_intervals = {
+                interval.task_id: interval
+                for interval in TaskStatusInterval.objects.filter(
+                    task_id__in={log[1] for log in logs}, exited_at__isnull=True
+                )
+            }
+            closed, created = [], []
+            for _, task_id, project_id, created_at, from_value, to_value, timestamp in logs:
+                current = open_intervals.get(task_id)
+                if current is None:
+                    # First transition seen: the task sat in from_value since
+                    # it was created.
+                    current = TaskStatusInterval(
+                        task_id=task_id, project_id=project_id, status=from_value, entered_at=created_at
+                    )
+                    created.append(current)
+                elif current.pk is not None:
+                    closed.append(current)
+                current.exited_at = max(timestamp, current.entered_at)
+                open_intervals[task_id] = TaskStatusInterval(
+                    task_id=task_id, project_id=project_id, status=to_value, entered_at=timestamp
+                )
+                created.append(open_intervals[task_id])
+
+            TaskStatusInterval.objects.bulk_update(closed, ['exited_at'], batch_size=500)
+            TaskStatusInterval.objects.bulk_create(created, batch_size=500)
+            checkpoint.position = logs[-1][0]
+            checkpoint.save(update_fields=['position', 'updated_at'])
+            processed += len(logs)
+
+    # Tasks that never changed status still count towards cumulative flow.
+    # One whose first change is still inside the lag window is left for the
+    # run that processes it, which starts from that log's from_value.
+    changed = ActivityLog.objects.filter(task=OuterRef('pk'), action_type='status_changed')
+    TaskStatusInterval.objects.bulk_create([
+        TaskStatusInterval(task_id=task_id, project_id=project_id, status=status, entered_at=created_at)
+        for task_id, project_id, status, created_at in Task.objects.filter(
+            ~Exists(changed), status_intervals__isnull=True, created_at__lt=cutoff
+        ).values_list('id', 'project_id', 'status', 'created_at').iterator()
+    ], batch_size=500)
+    return processed
+
+
+def _frame(queryset):
+    columns = ['task_id', 'status', 'entered_at', 'exited_at']
+    frame = pd.DataFrame.from_records(list(queryset.values_list(*columns)), columns=columns)
+    frame['entered_at'] = pd.to_datetime(frame['entered_at'], utc=True)
+    frame['exited_at'] = pd.to_datetime(frame['exited_at'], utc=True)
+    return frame
+
+
+def _percentiles(seconds):
+    seconds = seconds.dropna()
+    if seconds.empty:
+        return {'count': 0}
+    hours = seconds.quantile([p / 100 for p in PERCENTILES]) / 3600
+    summary = {'count': int(seconds.size)}
+    summary.update({f'p{p}': round(float(value), 1) for p, value in zip(PERCENTILES, hours)})
+    return summary
+
+
+def cycle_time_summary(project_id, since):
+    # Lead time runs from creation to done, cycle time from first entering
+    # in_progress to done, over tasks that reached done in the window and
+    # are still there. Hours.
+    done = TaskStatusInterval.objects.filter(
+        project_id=project_id, status='done', exited_at__isnull=True, entered_at__gte=since
+    )
+    intervals = _frame(TaskStatusInterval.objects.filter(task_id__in=done.values('task_id')))
+    by_task = intervals.groupby('task_id')
+    created = by_task['entered_at'].min()
+    done_at = intervals[(intervals['status'] == 'done') & intervals['exited_at'].isna()].set_index('task_id')['entered_at']
+    started = intervals[intervals['status'] == 'in_progress'].groupby('task_id')['entered_at'].min()
+
+    recent = _frame(TaskStatusInterval.objects.filter(project_id=project_id, exited_at__gte=since))
+    recent['seconds'] = (recent['exited_at'] - recent['entered_at']).dt.total_seconds()
+    return {
+        'lead_time_hours': _percentiles((done_at - created.reindex(done_at.index)).dt.total_seconds()),
+        'cycle_time_hours': _percentiles((done_at - started.reindex(done_at.index)).dt.total_seconds()),
+        'time_in_status_hours': {
+            status: _percentiles(recent.loc[recent['status'] == status, 'seconds']) for status in STATUSES
+        },
+    }
+
+
+def _epoch_ns(values):
+    return pd.DatetimeIndex(values).tz_convert('UTC').tz_localize(None).as_unit('ns').asi8
+
+
+def cumulative_flow(project_id, since, until):
+    # Tasks in each status at the end of every day: entered by then minus
+    # exited by then, via binary search over the sorted interval bounds.
+    intervals = _frame(TaskStatusInterval.objects.filter(project_id=project_id, entered_at__lte=until).exclude(
+        exited_at__lt=since
+    ))
+    tz = timezone.get_current_timezone()
+    days = pd.date_range(since.astimezone(tz).date(), until.astimezone(tz).date(), freq='D', tz=tz)
+    ends = _epoch_ns(days + pd.Timedelta(days=1))
+    series = {}
+    for status in STATUSES:
+        rows = intervals[intervals['status'] == status]
+        entered = np.sort(_epoch_ns(rows['entered_at']))
+        exited = np.sort(_epoch_ns(rows['exited_at'].dropna()))
+        counts = np.searchsorted(entered, ends, side='left') - np.searchsorted(exited, ends, side='left')
+        series[status] = counts.tolist()
+    return {'dates': [day.date().isoformat() for day in days], 'series': series}
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # Django's PBKDF2-SHA256 hasher with the work factor taken from
+    # PBKDF2_ITERATIONS. Hashes with a different count are upgraded the
+    # next time the user logs in.
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import ChangeJournal, Comment, Notification, ProcessingCheckpoint, Sprint, Task
+from .serializers import (
+    CommentSerializer, NotificationSerializer, SprintSerializer, TaskListSerializer, with_sprint_counts,
+    with_task_list_relations
+)
+
+CHECKPOINT = 'change_journal'
+KINDS = {Task: 'task', Comment: 'comment', Sprint: 'sprint', Notification: 'notification'}
+COLLECTIONS = {
+    'task': 'tasks', 'comment': 'comments', 'sprint': 'sprints', 'notification': 'notifications',
+    'project': 'projects',
+}
+
+
+class TokenExpired(Exception):
+    pass
+
+
+def journal_entry(instance, deleted=False):
+    kind = KINDS[type(instance)]
+    if kind == 'notification':
+        return ChangeJournal(kind=kind, object_id=instance.pk, recipient_id=instance.user_id, deleted=deleted)
+    project_id = instance.task.project_id if kind == 'comment' else instance.project_id
+    return ChangeJournal(kind=kind, object_id=instance.pk, project_id=project_id, deleted=deleted)
+
+
+def membership_entry(project_id, user_id, deleted=False):
+    return ChangeJournal(kind='project', object_id=project_id, recipient_id=user_id, deleted=deleted)
+
+
+def record_changes(kind, object_ids, project_id=None, recipient_id=None):
+    # For bulk updates, which skip the post_save receivers. Call it inside the
+    # transaction doing the update.
+    ChangeJournal.objects.bulk_create([
+        ChangeJournal(kind=kind, object_id=object_id, project_id=project_id, recipient_id=recipient_id)
+        for object_id in object_ids
+    ])
+
+
+def _journal_bounds():
+    # Entries younger than SYNC_LAG_SECONDS aren't handed out yet, so a row
+    # from a transaction that commits out of id order isn't skipped over.
+    horizon = ProcessingCheckpoint.objects.filter(name=CHECKPOINT).values_list('position', flat=True).first() or 0
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_LAG_SECONDS)
+    bounds = ChangeJournal.objects.aggregate(last=Max('id'), settled=Max('id', filter=Q(created_at__lt=cutoff)))
+    return horizon, max(bounds['last'] or 0, horizon), max(bounds['settled'] or 0, horizon)
+
+
+def _changed(queryset, ids, projects, project_lookup):
+    if not ids and not projects:
+        return queryset.none()
+    return queryset.filter(Q(pk__in=ids) | Q(**{f'{project_lookup}__in': projects}))
+
+
+def changes_since(user, projects, since=None, users=None):
+    # projects is the user's visible project queryset. Without a token this
+    # is a full snapshot; with one, each object changed after it appears once
+    # in its latest state or as a tombstone id under 'deleted'. Comments of a
+    # deleted task and everything in a left or deleted project get no
+    # tombstones of their own. A joined project comes with all its contents.
+    horizon, last, settled = _journal_bounds()
+    tasks = Task.objects.filter(project__in=projects)
+    comments = Comment.objects.filter(task__project__in=projects).select_related('author')
+    sprints = with_sprint_counts(Sprint.objects.filter(project__in=projects)).order_by('id')
+    notifications = Notification.objects.filter(user=user)
+    deleted = defaultdict(list)
+    more = False
+
+    if since is None:
+        token = settled
+    else:
+        if since < horizon or since > last:
+            raise TokenExpired
+        limit = settings.SYNC_PAGE_SIZE
+        page = list(ChangeJournal.objects.filter(
+            Q(project_id__in=projects.values('pk')) | Q(recipient_id=user.pk), id__gt=since, id__lte=settled
+        ).order_by('id').values_list('id', 'kind', 'object_id', 'deleted')[:limit + 1])
+        more = len(page) > limit
+        page = page[:limit]
+        token = page[-1][0] if more else max(since, settled)
+
+        latest = {}
+        for _, kind, object_id, is_deleted in page:
+            latest[kind, object_id] = is_deleted
+        changed = defaultdict(list)
+        for (kind, object_id), is_deleted in latest.items():
+            (deleted if is_deleted else changed)[kind].append(object_id)
+
+        joined = changed['project']
+        tasks = _changed(tasks, changed['task'], joined, 'project_id')
+        comments = _changed(comments, changed['comment'], joined, 'task__project_id')
+        sprints = _changed(sprints, changed['sprint'], joined, 'project_id')
+        notifications = notifications.filter(pk__in=changed['notification'])
+
+    context = {'users': users} if users is not None else {}
+    return {
+        'token': str(token),
+        'more': more,
+        'full': since is None,
+        'tasks': TaskListSerializer(with_task_list_relations(tasks), many=True, context=context).data,
+        'comments': CommentSerializer(comments, many=True, context=context).data,
+        'sprints': SprintSerializer(sprints, many=True).data,
+        'notifications': NotificationSerializer(notifications, many=True).data,
+        'deleted': {collection: deleted[kind] for kind, collection in COLLECTIONS.items()},
+    }
+
+
+def prune_journal(max_age):
+    # Clients holding a token from before the pruned range get 410 and take
+    # a fresh snapshot.
+    cutoff = timezone.now() - max_age
+    with transaction.atomic():
+        checkpoint, _ = ProcessingCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+        last = ChangeJournal.objects.filter(created_at__lt=cutoff).aggregate(last=Max('id'))['last']
+        if last is None:
+            return 0
+        pruned, _ = ChangeJournal.objects.filter(id__lte=last).delete()
+        checkpoint.position = max(checkpoint.position, last)
+        checkpoint.save(update_fields=['position', 'updated_at'])
+    return pruned
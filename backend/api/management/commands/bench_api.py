@@ -0,0 +1,125 @@
+import json
+import math
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+
+from api.synthetic import seed_org
+from api.tokens import TaskFlowRefreshToken
+
+ENDPOINTS = {
+    'board': '/api/projects/{project}/board/',
+    'dashboard_stats': '/api/dashboard/stats/',
+    'analytics_data': '/api/analytics/data/?days=30',
+    'team_stats': '/api/team/stats/',
+    'calendar_tasks': '/api/calendar/tasks/?view=month',
+    'tasks': '/api/tasks/?project={project}',
+}
+
+# Every run starts from an empty cache, so cold numbers are comparable and
+# nothing is read from or written to the configured cache backend.
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-api'}}
+
+
+def _percentile(ordered, fraction):
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic org into a throwaway test database and report p50/p95 latency and query counts of the '
+        'key endpoints as JSON. Same arguments give the same data, so outputs can be diffed across commits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--tasks', type=int, default=200, help='Tasks per project.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=30, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=sorted(ENDPOINTS))
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+
+    def handle(self, *args, **options):
+        # DEBUG off as in production; it also keeps seeding from filling the
+        # bounded query log that CaptureQueriesContext reads.
+        setup_test_environment(debug=False)
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CACHES=BENCH_CACHES):
+                report = self._run(options)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        body = json.dumps(report, indent=2, sort_keys=True) + '\n'
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(body)
+        else:
+            self.stdout.write(body, ending='')
+
+    def _run(self, options):
+        start = time.perf_counter()
+        created = seed_org(
+            'bench', users=options['users'], projects=options['projects'],
+            tasks_per_project=options['tasks'], seed=options['seed'],
+        )
+        seconds = time.perf_counter() - start
+        project = created['projects'][0]
+        token = TaskFlowRefreshToken.for_user(project.created_by).access_token
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        endpoints = {}
+        for name in options['endpoints'] or ENDPOINTS:
+            path = ENDPOINTS[name].format(project=project.pk)
+            endpoints[name] = self._measure(client, path, options['requests'], options['warmup'])
+
+        return {
+            'database': connection.vendor,
+            'dataset': {
+                'users': options['users'],
+                'projects': options['projects'],
+                'tasks_per_project': options['tasks'],
+                'seed': options['seed'],
+                'rows': {name: len(rows) for name, rows in created.items()},
+                'seed_seconds': round(seconds, 2),
+            },
+            'requests': options['requests'],
+            'endpoints': endpoints,
+        }
+
+    def _measure(self, client, path, requests, warmup):
+        with CaptureQueriesContext(connection) as cold:
+            response = client.get(path)
+        queries_cold = len(cold)
+        for _ in range(warmup):
+            client.get(path)
+
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        with CaptureQueriesContext(connection) as warm:
+            client.get(path)
+
+        return {
+            'path': path,
+            'status': response.status_code,
+            'bytes': len(response.content),
+            'queries_cold': queries_cold,
+            'queries': len(warm),
+            'p50_ms': round(_percentile(latencies, 0.5), 2),
+            'p95_ms': round(_percentile(latencies, 0.95), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+        }
@@ -0,0 +1,93 @@
+import io
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+
+
+def _payload(count):
+    now = datetime(2025, 1, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc)
+    user = {
+        'id': 1, 'username': 'ana@example.com', 'email': 'ana@example.com',
+        'first_name': 'Ana', 'last_name': 'Łukasiewicz', 'role': 'employee',
+        'avatar': None, 'created_at': '2025-01-01T09:30:15.123456Z',
+    }
+    return [
+        {
+            'id': i,
+            'project': 1,
+            'project_key': 'TF',
+            'title': f'Task {i} – naïve café rollout',
+            'description': 'Lorem ipsum dolor sit amet ' * 4,
+            'task_type': 'task',
+            'priority': 'medium',
+            'status': 'in_progress',
+            'reporter': user,
+            'assignee': user,
+            'sprint': None,
+            'story_points': 3,
+            'estimated_hours': Decimal('4.50'),
+            'due_date': date(2025, 1, 1) + timedelta(days=i % 30),
+            'start_date': None,
+            'labels': ['backend', 'perf'],
+            'order': i,
+            'comments_count': i % 7,
+            'created_at': now,
+            'updated_at': now,
+            'completed_at': None,
+        }
+        for i in range(count)
+    ]
+
+
+def _best(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = 'Compare JSONRenderer/JSONParser with the orjson-backed FastJSONRenderer/FastJSONParser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is not installed; FastJSONRenderer falls back to the stdlib encoder.')
+
+        data = _payload(options['tasks'])
+        repeat = options['repeat']
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+
+        body = stdlib.render(data)
+        if fast.render(data) != body:
+            raise CommandError('FastJSONRenderer output differs from JSONRenderer.')
+
+        results = {
+            'render': (
+                _best(lambda: stdlib.render(data), repeat),
+                _best(lambda: fast.render(data), repeat),
+            ),
+            'parse': (
+                _best(lambda: JSONParser().parse(io.BytesIO(body)), repeat),
+                _best(lambda: FastJSONParser().parse(io.BytesIO(body)), repeat),
+            ),
+        }
+
+        self.stdout.write(f"{options['tasks']} tasks, {len(body) / 1024:.0f} KiB, best of {repeat}")
+        for name, (baseline, candidate) in results.items():
+            self.stdout.write(
+                f'{name:>6}: stdlib {baseline * 1000:8.2f} ms  orjson {candidate * 1000:8.2f} ms  '
+                f'{baseline / candidate:5.1f}x'
+            )
@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils.module_loading import import_string
+
+from api.models import User
+from api.throttling import TokenBucketThrottle
+
+PASSWORD = 'correct horse battery staple'
+
+
+def _rate(func, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        func()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    help = 'Measure password checks/sec per hasher and end-to-end logins/sec on one core.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        for name, path in settings.PASSWORD_HASHER_CHOICES.items():
+            hasher = import_string(path)()
+            try:
+                encoded = hasher.encode(PASSWORD, hasher.salt())
+            except (ValueError, ImportError) as exc:
+                self.stdout.write(f'{name:>8}: unavailable ({exc})')
+                continue
+            rate = _rate(lambda: hasher.verify(PASSWORD, encoded), seconds)
+            self.stdout.write(f'{name:>8}: {rate:8.1f} checks/s  {1000 / rate:7.1f} ms/check')
+
+        self.stdout.write(f'{self._logins(seconds):8.1f} logins/s end to end ({settings.PASSWORD_HASHER})')
+
+    def _logins(self, seconds):
+        email = 'bench-login@example.com'
+        User.objects.filter(email=email).delete()
+        User.objects.create_user(username=email, email=email, password=PASSWORD)
+        client = Client()
+        rates = dict(settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}), login=None, login_email=None)
+        try:
+            with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)):
+                TokenBucketThrottle.reset()
+
+                def login():
+                    response = client.post(
+                        '/api/auth/login/', {'email': email.upper(), 'password': PASSWORD},
+                        content_type='application/json',
+                    )
+                    assert response.status_code == 200, response.content
+
+                return _rate(login, seconds)
+        finally:
+            User.objects.filter(email=email).delete()
@@ -0,0 +1,108 @@
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/health/')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server on port {port} did not become healthy in {timeout}s')
+
+
+def _worker(port, path, headers, count):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies, errors = [], 0
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Measure requests/sec of the development server against the gunicorn production setup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/health/')
+        parser.add_argument('--token', help='Bearer token for authenticated endpoints.')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--servers', default='runserver,gunicorn')
+
+    def handle(self, *args, **options):
+        headers = {'Accept-Encoding': 'identity'}
+        if options['token']:
+            headers['Authorization'] = f"Bearer {options['token']}"
+
+        for server in options['servers'].split(','):
+            port = _free_port()
+            env = dict(os.environ, DJANGO_DEBUG='false')
+            if server == 'runserver':
+                cmd = [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}']
+            elif server == 'gunicorn':
+                env['GUNICORN_BIND'] = f'127.0.0.1:{port}'
+                env['GUNICORN_LOG_LEVEL'] = 'warning'
+                cmd = ['gunicorn', '--config', 'gunicorn.conf.py', '--access-logfile', '/dev/null']
+            else:
+                raise CommandError(f'Unknown server {server!r}')
+
+            process = subprocess.Popen(
+                cmd, cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                _wait_until_ready(port)
+                self.stdout.write(self._run(server, port, options, headers))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    def _run(self, server, port, options, headers):
+        concurrency = options['concurrency']
+        per_worker = max(1, options['requests'] // concurrency)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(
+                lambda _: _worker(port, options['path'], headers, per_worker), range(concurrency)
+            ))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for worker, _ in results for latency in worker)
+        errors = sum(count for _, count in results)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        return (
+            f'{server:>10}: {len(latencies) / elapsed:8.1f} req/s  '
+            f'p50 {statistics.median(latencies) * 1000:6.1f} ms  p95 {p95 * 1000:6.1f} ms  '
+            f'errors {errors}'
+        )
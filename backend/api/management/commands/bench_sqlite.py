@@ -0,0 +1,96 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+ENGINES = {
+    'default': 'django.db.backends.sqlite3',
+    'tuned': 'taskflow.sqlite3',
+}
+
+
+def _register(alias, engine, path):
+    # configure_settings() fills in the defaults Django expects for an alias;
+    # it insists on a 'default' entry, so pass the current one through.
+    configured = connections.configure_settings({
+        'default': connections.settings['default'],
+        alias: {'ENGINE': engine, 'NAME': path},
+    })
+    connections.settings[alias] = configured[alias]
+
+
+def _worker(alias, operations, results):
+    done = errors = 0
+    rng = random.Random()
+    for _ in range(operations):
+        task_id = rng.randint(1, 200)
+        try:
+            if rng.random() < 0.5:
+                # A board drag: read the column, then write the new order and
+                # an activity row in one transaction.
+                with transaction.atomic(using=alias):
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute('SELECT COALESCE(MAX("order"), 0) FROM bench_task WHERE status = %s', ['todo'])
+                        top = cursor.fetchone()[0]
+                        cursor.execute('UPDATE bench_task SET "order" = %s, status = %s WHERE id = %s', [top + 1, 'todo', task_id])
+                        cursor.execute('INSERT INTO bench_event (task_id, kind, ts) VALUES (%s, %s, %s)', [task_id, 'moved', time.time()])
+            else:
+                # A behavioral event logged outside any transaction.
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('INSERT INTO bench_event (task_id, kind, ts) VALUES (%s, %s, %s)', [task_id, 'opened', time.time()])
+            done += 1
+        except OperationalError:
+            errors += 1
+    connections[alias].close()
+    results.append((done, errors))
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent write throughput of the stock SQLite backend and taskflow.sqlite3.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=300, help='Operations per thread.')
+
+    def handle(self, *args, **options):
+        for mode, engine in ENGINES.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                alias = f'bench_{mode}'
+                _register(alias, engine, os.path.join(tmp, 'bench.sqlite3'))
+                self._setup(alias)
+
+                results = []
+                threads = [
+                    threading.Thread(target=_worker, args=(alias, options['operations'], results))
+                    for _ in range(options['threads'])
+                ]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+
+                connections[alias].close()
+                del connections.settings[alias]
+
+            done = sum(ok for ok, _ in results)
+            errors = sum(failed for _, failed in results)
+            self.stdout.write(
+                f'{mode:>8}: {done / elapsed:8.1f} ops/s  {done} ok  {errors} "database is locked"  '
+                f'{elapsed:.2f}s'
+            )
+
+    def _setup(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE bench_task (id INTEGER PRIMARY KEY, status TEXT, "order" INTEGER)')
+            cursor.execute('CREATE TABLE bench_event (id INTEGER PRIMARY KEY, task_id INTEGER, kind TEXT, ts REAL)')
+            cursor.executemany(
+                'INSERT INTO bench_task (id, status, "order") VALUES (%s, %s, %s)',
+                [(i, 'todo', i) for i in range(1, 201)],
+            )
+        connections[alias].close()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.avatars import build_thumbnails
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or outdated avatar thumbnails (or all of them with --all).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild even up-to-date thumbnails.')
+
+    def handle(self, *args, **options):
+        built = 0
+        for user_id, avatar, thumbnails in User.objects.exclude(avatar='').exclude(avatar__isnull=True).values_list(
+            'id', 'avatar', 'avatar_thumbnails'
+        ).iterator():
+            if options['all'] or (thumbnails or {}).get('source') != avatar:
+                build_thumbnails(user_id)
+                built += 1
+        self.stdout.write(f'Built thumbnails for {built} users')
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.behavior import build_profiles
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user productivity profiles from BehavioralEvent and ActivityLog. Run from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Look-back window.')
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only rebuild these user ids.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = build_profiles(options['days'], options['users'])
+        self.stdout.write(f'Built {count} profiles in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.flow import process_status_changes
+
+
+class Command(BaseCommand):
+    help = 'Fold new status_changed activity into TaskStatusInterval rows. Safe to run repeatedly from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        processed = process_status_changes(options['batch_size'])
+        self.stdout.write(f'Processed {processed} status changes in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.journal import prune_journal
+
+
+class Command(BaseCommand):
+    help = 'Delete change-journal entries older than the retention window. Safe to run repeatedly from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SYNC_JOURNAL_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        pruned = prune_journal(timedelta(days=options['days']))
+        self.stdout.write(f'Pruned {pruned} change-journal entries')
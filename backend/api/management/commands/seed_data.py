@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import User
+from api.synthetic import delete_org, seed_org
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic organisation of users, projects, tasks and their history with bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', default='synthetic', help='Name used in emails and project keys.')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--tasks', type=int, default=200, help='Tasks per project.')
+        parser.add_argument('--days', type=int, default=120, help='Length of the generated history.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--password', default='password', help='Password for every seeded user.')
+        parser.add_argument('--replace', action='store_true', help='Delete an existing org of the same name first.')
+
+    def handle(self, *args, **options):
+        org = options['org']
+        if User.objects.filter(email=f'{org}-user0@example.com').exists():
+            if not options['replace']:
+                raise CommandError(f'Org {org!r} is already seeded; pass --replace to rebuild it.')
+            self.stdout.write(f'Deleted {delete_org(org)} rows of {org!r}')
+
+        start = time.perf_counter()
+        created = seed_org(
+            org, users=options['users'], projects=options['projects'], tasks_per_project=options['tasks'],
+            seed=options['seed'], history_days=options['days'], password=options['password'],
+        )
+        self.stdout.write(f'Seeded {org!r} in {time.perf_counter() - start:.2f}s')
+        for name, rows in created.items():
+            self.stdout.write(f'{name:>18}: {len(rows)}')
+        if created['projects']:
+            self.stdout.write(f"Log in as {created['projects'][0].created_by.email} / {options['password']}")
@@ -0,0 +1,273 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_current = ContextVar('request_metrics', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES \(([^()]*)\)(?:\s*,\s*\(\1\))+', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    # Queries that differ only in their parameters, IN list length or number
+    # of bulk-inserted rows share a fingerprint, so an N+1 shows up as one
+    # fingerprint repeated N times.
+    sql = _STRING.sub('?', sql.replace('%s', '?'))
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub(r'VALUES (\1), ...', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    # Collects timings for one request. Installed as a database execute
+    # wrapper, so every query on every alias passes through __call__.
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        self.statements = defaultdict(lambda: [0, 0.0])
+        self.slow = []
+        self._timing = None
+        self._slow_threshold = settings.METRICS_SLOW_QUERY_MS / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            entry = self.statements[sql]
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed >= self._slow_threshold:
+                self.slow.append((elapsed, sql))
+
+    def absorb(self, other):
+        # Folds in what another thread recorded for this request, e.g. batched
+        # sub-requests run concurrently.
+        self.queries += other.queries
+        self.db_time += other.db_time
+        self.serializer_time += other.serializer_time
+        self.render_time += other.render_time
+        for sql, (count, elapsed) in other.statements.items():
+            entry = self.statements[sql]
+            entry[0] += count
+            entry[1] += elapsed
+        self.slow.extend(other.slow)
+
+    def fingerprints(self):
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, (count, elapsed) in self.statements.items():
+            entry = grouped[fingerprint(sql)]
+            entry[0] += count
+            entry[1] += elapsed
+        return sorted(grouped.items(), key=lambda item: (-item[1][0], -item[1][1]))
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serializer_time * 1000:.2f}, '
+            f'render;dur={self.render_time * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+
+    def log_offenders(self, method, view):
+        for elapsed, sql in self.slow:
+            logger.warning('Slow query in %s %s (%.1f ms): %s', method, view, elapsed * 1000, fingerprint(sql))
+        if self.queries < settings.METRICS_QUERY_THRESHOLD:
+            return
+        top = '\n'.join(
+            f'  {count:>5}x {elapsed * 1000:8.1f} ms  {statement}'
+            for statement, (count, elapsed) in self.fingerprints()[:10]
+        )
+        logger.warning(
+            '%s %s ran %d queries (%.1f ms in the database):\n%s',
+            method, view, self.queries, self.db_time * 1000, top,
+        )
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_request():
+    return _current.get()
+
+
+def _timed(prop, attribute):
+    # Only the outermost call is timed, so a SerializerMethodField that builds
+    # another serializer's .data isn't counted twice. Lazy queries run while
+    # serializing are counted in both db and serialize.
+    getter = prop.fget
+
+    def timed(self):
+        metrics = _current.get()
+        if metrics is None or metrics._timing is not None:
+            return getter(self)
+        metrics._timing = attribute
+        start = time.perf_counter()
+        try:
+            return getter(self)
+        finally:
+            setattr(metrics, attribute, getattr(metrics, attribute) + time.perf_counter() - start)
+            metrics._timing = None
+
+    timed.__wrapped__ = getter
+    return property(timed)
+
+
+_installed = False
+
+
+def install_timers():
+    global _installed
+    if _installed:
+        return
+    from rest_framework import serializers
+    from rest_framework.response import Response
+
+    serializers.Serializer.data = _timed(serializers.Serializer.data, 'serializer_time')
+    serializers.ListSerializer.data = _timed(serializers.ListSerializer.data, 'serializer_time')
+    Response.rendered_content = _timed(Response.rendered_content, 'render_time')
+    _installed = True
+
+
+def _labels(**labels):
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative}'
+        yield f'{name}_sum{_labels(**labels)} {_number(self.sum)}'
+        yield f'{name}_count{_labels(**labels)} {cumulative}'
+
+
+class ViewStats:
+    def __init__(self):
+        self.responses = defaultdict(int)
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        self.response_bytes = 0
+
+
+COUNTERS = (
+    ('db_duration_seconds_total', 'db_time', 'Time spent waiting on the database.'),
+    ('serializer_duration_seconds_total', 'serializer_time', 'Time spent in serializer .data.'),
+    ('render_duration_seconds_total', 'render_time', 'Time spent rendering response bodies.'),
+    ('response_bytes_total', 'response_bytes', 'Uncompressed response body bytes.'),
+)
+
+
+class Registry:
+    # Per process: with several gunicorn workers each keeps its own numbers
+    # and a scrape sees whichever worker answered it.
+
+    def __init__(self, prefix='taskflow'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewStats)
+
+    def observe(self, view, method, status, duration, metrics, size):
+        with self._lock:
+            stats = self._views[(view, method)]
+            stats.responses[status] += 1
+            stats.duration.observe(duration)
+            stats.queries.observe(metrics.queries)
+            stats.db_time += metrics.db_time
+            stats.serializer_time += metrics.serializer_time
+            stats.render_time += metrics.render_time
+            stats.response_bytes += size
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        prefix = self.prefix
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                f'# HELP {prefix}_requests_total Responses by view, method and status code.',
+                f'# TYPE {prefix}_requests_total counter',
+            ]
+            for (view, method), stats in views:
+                for status, count in sorted(stats.responses.items()):
+                    lines.append(f'{prefix}_requests_total{_labels(view=view, method=method, status=status)} {count}')
+
+            for name, attribute, help_text in (
+                ('request_duration_seconds', 'duration', 'Time from middleware entry to response.'),
+                ('db_queries', 'queries', 'SQL queries per request.'),
+            ):
+                lines.append(f'# HELP {prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {prefix}_{name} histogram')
+                for (view, method), stats in views:
+                    lines.extend(getattr(stats, attribute).lines(f'{prefix}_{name}', {'view': view, 'method': method}))
+
+            for name, attribute, help_text in COUNTERS:
+                lines.append(f'# HELP {prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {prefix}_{name} counter')
+                for (view, method), stats in views:
+                    value = getattr(stats, attribute)
+                    lines.append(f'{prefix}_{name}{_labels(view=view, method=method)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Unmatched paths would otherwise add one series per probe URL.
+        return 'unmatched'
+    return match.view_name or match.route
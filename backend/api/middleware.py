@@ -0,0 +1,202 @@
+import gzip
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+from .db_routers import SAFE_METHODS, pin_to_primary, replica_aliases
+from .metrics import finish_request, install_timers, registry, start_request, view_label
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+INCOMPRESSIBLE_TYPES = ('image/', 'video/', 'audio/', 'application/zip', 'application/gzip', 'font/woff')
+
+
+def accepted_encodings(header):
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    # Like django.middleware.gzip.GZipMiddleware, but prefers brotli when the
+    # client accepts it, skips bodies below COMPRESSION_MIN_SIZE, and reports
+    # the original size and time spent compressing so the CPU/bytes tradeoff
+    # shows up in X-Uncompressed-Length and Server-Timing.
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+
+    def negotiate(self, request):
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and encodings.get('br', 0) > 0:
+            return 'br'
+        if encodings.get('gzip', 0) > 0:
+            return 'gzip'
+        return None
+
+    def compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        if self.gzip_level == 6:
+            return compress_string(content, max_random_bytes=self.max_random_bytes)
+        return gzip.compress(content, compresslevel=self.gzip_level, mtime=0)
+
+    def compress_stream(self, response, encoding):
+        if encoding == 'br':
+            if response.is_async:
+                original_iterator = response.streaming_content
+
+                async def brotli_wrapper():
+                    compressor = brotli.Compressor(quality=self.brotli_quality)
+                    async for chunk in original_iterator:
+                        data = compressor.process(chunk)
+                        if data:
+                            yield data
+                    yield compressor.finish()
+
+                return brotli_wrapper()
+            return brotli_sequence(response.streaming_content, self.brotli_quality)
+
+        if response.is_async:
+            original_iterator = response.streaming_content
+
+            async def gzip_wrapper():
+                async for chunk in original_iterator:
+                    yield compress_string(chunk, max_random_bytes=self.max_random_bytes)
+
+            return gzip_wrapper()
+        return compress_sequence(response.streaming_content, max_random_bytes=self.max_random_bytes)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.get('Content-Type', '').startswith(INCOMPRESSIBLE_TYPES):
+            return response
+        # Byte ranges refer to the stored bytes; compressing would break them.
+        if response.has_header('Accept-Ranges'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.negotiate(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response, encoding)
+            del response.headers['Content-Length']
+        else:
+            start = time.perf_counter()
+            compressed_content = self.compress(response.content, encoding)
+            elapsed = (time.perf_counter() - start) * 1000
+            if len(compressed_content) >= len(response.content):
+                return response
+            original_length = len(response.content)
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(compressed_content))
+            response.headers['X-Uncompressed-Length'] = str(original_length)
+            timing = f'compress;dur={elapsed:.2f};desc="{encoding}"'
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response.headers['Server-Timing'] = timing
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
+
+
+class ReadYourWritesMiddleware:
+    # Pins users to the primary database for a short while after a
+    # successful write, so replica-routed views show their own changes.
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and not getattr(request, 'skip_primary_pin', False)
+                and user is not None and user.is_authenticated):
+            pin_to_primary(user)
+        return response
+
+
+class MetricsMiddleware:
+    # Records query count, database time, serializer and render time and
+    # response size per view into api.metrics.registry (scraped at /metrics),
+    # and reports them to the client in Server-Timing. Sits inside
+    # CompressionMiddleware so sizes are uncompressed.
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        install_timers()
+        self.get_response = get_response
+        self.server_timing = settings.METRICS_SERVER_TIMING
+
+    def __call__(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            finish_request(token)
+        elapsed = time.perf_counter() - start
+
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        view = view_label(request)
+        registry.observe(view, request.method, response.status_code, elapsed, metrics, size)
+        metrics.log_offenders(request.method, view)
+
+        if self.server_timing:
+            timing = metrics.server_timing(elapsed)
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response.headers['Server-Timing'] = timing
+        return response
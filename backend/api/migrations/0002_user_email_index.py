@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:28
+
+import api.models
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', api.models.TaskFlowUserManager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='api_user_email_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_user_email_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['first_name', 'last_name', 'email'], name='api_user_directory_idx'),
+        ),
+    ]
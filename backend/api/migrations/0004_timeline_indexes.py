@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_user_directory_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['task', '-timestamp', '-id'], name='api_activity_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', '-created_at', '-id'], name='api_comment_timeline_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_task_due_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProductivityProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='productivity_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('window_days', models.IntegerField()),
+                ('events_analyzed', models.IntegerField(default=0)),
+                ('hour_of_week', models.JSONField(default=list)),
+                ('best_hour', models.IntegerField(blank=True, null=True)),
+                ('median_status_seconds', models.JSONField(default=dict)),
+                ('focus_sessions', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:40
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def build_paths_and_rollups(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    tasks = {task.id: task for task in Task.objects.only(
+        'id', 'parent_task_id', 'story_points', 'estimated_hours', 'status'
+    )}
+    children = {}
+    for task in tasks.values():
+        children.setdefault(task.parent_task_id, []).append(task)
+    for task in tasks.values():
+        task.path = ''
+        task.rollup_story_points = task.rollup_task_count = task.rollup_done_count = 0
+        task.rollup_estimated_hours = Decimal('0')
+
+    def walk(task, path):
+        task.path = path
+        totals = [0, Decimal('0'), 0, 0]
+        for child in children.get(task.id, []):
+            below = walk(child, f'{path}{task.id}/')
+            own = [child.story_points or 0, child.estimated_hours or 0, 1, int(child.status == 'done')]
+            totals = [total + a + b for total, a, b in zip(totals, own, below)]
+        (task.rollup_story_points, task.rollup_estimated_hours,
+         task.rollup_task_count, task.rollup_done_count) = totals
+        return totals
+
+    for root in children.get(None, []):
+        walk(root, '')
+    Task.objects.bulk_update(tasks.values(), [
+        'path', 'rollup_story_points', 'rollup_estimated_hours', 'rollup_task_count', 'rollup_done_count'
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_task_status_intervals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rollup_done_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rollup_estimated_hours',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=9),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rollup_story_points',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rollup_task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(build_paths_and_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_user_avatar_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeJournal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Task'), ('comment', 'Comment'), ('sprint', 'Sprint'), ('notification', 'Notification'), ('project', 'Project')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('project_id', models.BigIntegerField(blank=True, null=True)),
+                ('recipient_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project_id', 'id'], name='api_journal_project_idx'), models.Index(fields=['recipient_id', 'id'], name='api_journal_recipient_idx')],
+            },
+        ),
+    ]
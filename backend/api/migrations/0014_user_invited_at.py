@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_user_name_upper_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='invited_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,7 +1,18 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db import models, transaction
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr, Upper
 from django.utils import timezone
 import json
+import uuid
+
+class TaskFlowUserManager(UserManager):
+    def by_email(self, email):
+        # Matches the functional index on UPPER(email) below.
+        return self.alias(email_upper=Upper('email')).filter(email_upper=email.upper())
+    
+    def by_emails(self, emails):
+        return self.alias(email_upper=Upper('email')).filter(email_upper__in=[email.upper() for email in emails])
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -11,11 +22,40 @@ class User(AbstractUser):
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='employee')
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # {'source': avatar name, 'sizes': {'64': {'webp': name, 'jpeg': name}}},
+    # filled in by api.avatars after the avatar changes.
+    avatar_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+    # Set when a project invite creates the account, cleared once the
+    # invitee claims it by registering. Only these accounts can be claimed.
+    invited_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = TaskFlowUserManager()
+    
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Upper('email'), name='api_user_email_upper_idx'),
+            # Directory search prefix-matches each of these separately
+            # (api.directory.search_users); the composite index below only
+            # serves DIRECTORY_ORDERING.
+            models.Index(Upper('first_name'), name='api_user_first_name_upper_idx'),
+            models.Index(Upper('last_name'), name='api_user_last_name_upper_idx'),
+            models.Index(fields=['first_name', 'last_name', 'email'], name='api_user_directory_idx'),
+        ]
+    
     def __str__(self):
         return self.email or self.username
 
+class JournaledModel(models.Model):
+    # Saves run in one transaction with the ChangeJournal row that the
+    # post_save receiver in signals.py writes for them.
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
 class Project(models.Model):
     name = models.CharField(max_length=255)
     key = models.CharField(max_length=10, unique=True)
@@ -29,7 +69,7 @@ class Project(models.Model):
     def __str__(self):
         return f"{self.key} - {self.name}"
 
-class ProjectMember(models.Model):
+class ProjectMember(JournaledModel):
     ROLE_CHOICES = [
         ('admin', 'Admin'),
         ('member', 'Member'),
@@ -43,7 +83,7 @@ class ProjectMember(models.Model):
     class Meta:
         unique_together = ['project', 'user']
 
-class Sprint(models.Model):
+class Sprint(JournaledModel):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='sprints')
     name = models.CharField(max_length=255)
     goal = models.TextField(blank=True)
@@ -56,7 +96,10 @@ class Sprint(models.Model):
     def __str__(self):
         return f"{self.project.key} - {self.name}"
 
-class Task(models.Model):
+class VersionConflict(Exception):
+    pass
+
+class Task(JournaledModel):
     STATUS_CHOICES = [
         ('backlog', 'Backlog'),
         ('todo', 'To Do'),
@@ -99,21 +142,131 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by every save; updates only apply while the row is still at the
+    # version the instance was read at (or the one a client sent).
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Ancestor ids root first, e.g. "12/34/"; descendants of a task are the
+    # rows whose path starts with f"{path}{id}/".
+    path = models.CharField(max_length=255, blank=True, default='', db_index=True, editable=False)
+    # Totals over all descendants, excluding the task itself. Adjusted by
+    # deltas on save/delete rather than recomputed.
+    rollup_story_points = models.IntegerField(default=0, editable=False)
+    rollup_estimated_hours = models.DecimalField(max_digits=9, decimal_places=2, default=0, editable=False)
+    rollup_task_count = models.IntegerField(default=0, editable=False)
+    rollup_done_count = models.IntegerField(default=0, editable=False)
+    
+    TREE_STATE_FIELDS = ['parent_task_id', 'path', 'story_points', 'estimated_hours', 'status']
+    ROLLUP_FIELDS = ['rollup_story_points', 'rollup_estimated_hours', 'rollup_task_count', 'rollup_done_count']
     
     class Meta:
         ordering = ['order', '-created_at']
+        indexes = [
+            models.Index(fields=['project', 'due_date'], name='api_task_project_due_idx'),
+        ]
     
     def __str__(self):
         return f"{self.project.key}-{self.id}: {self.title}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tree_state = instance._current_tree_state() if all(
+            name in field_names for name in cls.TREE_STATE_FIELDS
+        ) else None
+        return instance
+    
+    def _current_tree_state(self):
+        return tuple(getattr(self, name) for name in self.TREE_STATE_FIELDS)
+    
     def save(self, *args, **kwargs):
         if self.status == 'done' and not self.completed_at:
             self.completed_at = timezone.now()
         elif self.status != 'done':
             self.completed_at = None
-        super().save(*args, **kwargs)
+        
+        previous = None
+        if not self._state.adding:
+            previous = getattr(self, '_tree_state', None) or Task.objects.filter(pk=self.pk).values_list(
+                *self.TREE_STATE_FIELDS
+            ).first()
+            # Rollups are only ever changed by the atomic increments below, so
+            # a stale instance must not write them back.
+            if kwargs.get('update_fields') is None and previous is not None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.ROLLUP_FIELDS
+                ]
+        
+        if not self._state.adding:
+            self._expected_version = self.version
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        
+        try:
+            with transaction.atomic():
+                reparented = previous is None or previous[0] != self.parent_task_id
+                if reparented:
+                    self.path = ''
+                    if self.parent_task_id is not None:
+                        parent_path = Task.objects.filter(pk=self.parent_task_id).values_list('path', flat=True).get()
+                        self.path = f'{parent_path}{self.parent_task_id}/'
+                    if kwargs.get('update_fields') is not None:
+                        kwargs['update_fields'] = {*kwargs['update_fields'], 'path'}
+                super().save(*args, **kwargs)
+                self._update_tree(previous, reparented)
+        except VersionConflict:
+            self.version = self._expected_version
+            raise
+        finally:
+            self._expected_version = None
+        self._tree_state = self._current_tree_state()
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # UPDATE ... WHERE id = %s AND version = %s: no row lock, and a lost
+        # race shows up as zero rows updated.
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if super()._do_update(base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update):
+            return True
+        raise VersionConflict
+    
+    def _update_tree(self, previous, reparented):
+        own = tree_contribution(self.story_points, self.estimated_hours, self.status)
+        if previous is None:
+            adjust_rollups(self.path, own)
+            return
+        
+        old_parent_id, old_path, old_points, old_hours, old_status = previous
+        old_own = tree_contribution(old_points, old_hours, old_status)
+        if not reparented:
+            adjust_rollups(self.path, [new - old for new, old in zip(own, old_own)])
+            return
+        
+        # The whole subtree moves: take it off the old ancestors, add it to
+        # the new ones and rewrite the descendants' path prefix.
+        below = Task.objects.filter(pk=self.pk).values_list(*self.ROLLUP_FIELDS).get()
+        adjust_rollups(old_path, [-(a + b) for a, b in zip(old_own, below)])
+        adjust_rollups(self.path, [a + b for a, b in zip(own, below)])
+        old_prefix, new_prefix = f'{old_path}{self.pk}/', f'{self.path}{self.pk}/'
+        if old_prefix != new_prefix:
+            Task.objects.filter(path__startswith=old_prefix).update(
+                path=Concat(Value(new_prefix), Substr('path', len(old_prefix) + 1))
+            )
 
-class Comment(models.Model):
+def tree_contribution(story_points, estimated_hours, status):
+    return [story_points or 0, estimated_hours or 0, 1, 1 if status == 'done' else 0]
+
+def adjust_rollups(path, deltas):
+    ancestor_ids = [int(part) for part in path.split('/') if part]
+    if not ancestor_ids or not any(deltas):
+        return
+    Task.objects.filter(pk__in=ancestor_ids).update(**{
+        field: F(field) + delta for field, delta in zip(Task.ROLLUP_FIELDS, deltas)
+    })
+
+class Comment(JournaledModel):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
@@ -122,14 +275,35 @@ class Comment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['task', '-created_at', '-id'], name='api_comment_timeline_idx'),
+        ]
 
 class Attachment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
+    # Content-addressed (attachments/<sha256[:2]>/<sha256>), so identical
+    # uploads share one file on disk.
     file = models.FileField(upload_to='attachments/')
     filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+class AttachmentUpload(models.Model):
+    # A resumable upload in progress; bytes go to MEDIA_ROOT/uploads/<id>.part
+    # until `received` reaches `size`.
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachment_uploads')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
 class ActivityLog(models.Model):
     ACTION_CHOICES = [
         ('created', 'Created'),
@@ -151,6 +325,9 @@ class ActivityLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['task', '-timestamp', '-id'], name='api_activity_timeline_idx'),
+        ]
 
 class BehavioralEvent(models.Model):
     EVENT_CHOICES = [
@@ -188,7 +365,7 @@ class TimeEntry(models.Model):
     class Meta:
         ordering = ['-start_time']
 
-class Notification(models.Model):
+class Notification(JournaledModel):
     TYPE_CHOICES = [
         ('task_assigned', 'Task Assigned'),
         ('status_changed', 'Status Changed'),
@@ -208,3 +385,66 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+
+class UserProductivityProfile(models.Model):
+    # Written by the build_productivity_profiles batch job; the API only reads
+    # these rows.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='productivity_profile')
+    window_days = models.IntegerField()
+    events_analyzed = models.IntegerField(default=0)
+    hour_of_week = models.JSONField(default=list)
+    best_hour = models.IntegerField(null=True, blank=True)
+    median_status_seconds = models.JSONField(default=dict)
+    focus_sessions = models.JSONField(default=dict)
+    computed_at = models.DateTimeField()
+
+class TaskStatusInterval(models.Model):
+    # One row per stretch of time a task spent in a status, derived from
+    # status_changed activity by the process_status_intervals command.
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='status_intervals')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='status_intervals')
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    entered_at = models.DateTimeField()
+    exited_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['entered_at']
+        indexes = [
+            models.Index(fields=['project', 'entered_at'], name='api_interval_project_idx'),
+            models.Index(fields=['task', 'exited_at'], name='api_interval_task_idx'),
+        ]
+
+class ProcessingCheckpoint(models.Model):
+    # How far an incremental job has read through its source table.
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+class ChangeJournal(models.Model):
+    # Append-only record of task, comment, sprint and notification writes,
+    # read by /api/sync/; the id is the client's change token. Project and
+    # recipient are plain ids so tombstones outlive the rows they point at.
+    # 'project' entries tell one recipient they joined or left a project.
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('comment', 'Comment'),
+        ('sprint', 'Sprint'),
+        ('notification', 'Notification'),
+        ('project', 'Project'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    project_id = models.BigIntegerField(null=True, blank=True)
+    recipient_id = models.BigIntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'id'], name='api_journal_project_idx'),
+            models.Index(fields=['recipient_id', 'id'], name='api_journal_recipient_idx'),
+        ]
@@ -1,21 +1,28 @@
 from rest_framework import permissions
 
 
+def is_scrum_master(request):
+    # Prefer the role claim on the JWT so no user fields need loading.
+    token = request.auth
+    role = token.get('role') if hasattr(token, 'get') else None
+    return (role or request.user.role) == 'scrum_master'
+
+
 class IsScrumMasterOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return request.user.is_authenticated and request.user.role == 'scrum_master'
+        return request.user.is_authenticated and is_scrum_master(request)
 
 
 class IsScrumMaster(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'scrum_master'
+        return request.user.is_authenticated and is_scrum_master(request)
 
 
 class IsOwnerOrScrumMaster(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if request.user.role == 'scrum_master':
+        if is_scrum_master(request):
             return True
         if hasattr(obj, 'created_by'):
             return obj.created_by == request.user
@@ -30,7 +37,7 @@ class CanManageTask(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        if request.user.role == 'scrum_master':
+        if is_scrum_master(request):
             return True
         if request.method in permissions.SAFE_METHODS:
             return True
@@ -39,7 +46,7 @@ class CanManageTask(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if request.user.role == 'scrum_master':
+        if is_scrum_master(request):
             return True
         if request.method in permissions.SAFE_METHODS:
             return True
@@ -54,14 +61,14 @@ class CanManageProject(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        if request.user.role == 'scrum_master':
+        if is_scrum_master(request):
             return True
         if request.method in permissions.SAFE_METHODS:
             return True
         return False
 
     def has_object_permission(self, request, view, obj):
-        if request.user.role == 'scrum_master':
+        if is_scrum_master(request):
             return True
         if request.method in permissions.SAFE_METHODS:
             return True
@@ -74,7 +81,7 @@ class CanManageSprint(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        if request.user.role == 'scrum_master':
+        if is_scrum_master(request):
             return True
         if request.method in permissions.SAFE_METHODS:
             return True
@@ -1,15 +1,26 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from .models import (
     User, Project, ProjectMember, Sprint, Task, Comment, 
-    Attachment, ActivityLog, BehavioralEvent, TimeEntry, Notification
+    Attachment, AttachmentUpload, ActivityLog, BehavioralEvent, TimeEntry, Notification
 )
+from .sparse import NormalizedUsersMixin, SparseFieldsSerializerMixin, thumbnail_urls
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar_thumbnails = serializers.SerializerMethodField()
+    
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role', 'avatar', 'created_at']
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'role', 'avatar', 'avatar_thumbnails',
+                  'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    def get_avatar_thumbnails(self, obj):
+        return thumbnail_urls(obj.avatar_thumbnails, obj.avatar.name, self.context.get('request'))
 
 class UserRegisterSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -19,11 +30,31 @@ class UserRegisterSerializer(serializers.Serializer):
     role = serializers.ChoiceField(choices=['employee', 'scrum_master'], default='employee')
     
     def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
+        # Accounts created by a project invite have no password yet and are
+        # claimed by registering. Nothing else is: not staff, not accounts
+        # that merely have an unusable password.
+        self.invited_user = User.objects.by_email(value).filter(
+            invited_at__isnull=False, password__startswith='!', is_staff=False, is_superuser=False
+        ).order_by('id').first()
+        if self.invited_user is None and User.objects.by_email(value).exists():
             raise serializers.ValidationError('This email is already registered.')
         return value
     
     def create(self, validated_data):
+        if self.invited_user is not None:
+            # The role stays what the invite gave them.
+            with transaction.atomic():
+                user = User.objects.select_for_update().filter(
+                    pk=self.invited_user.pk, invited_at__isnull=False
+                ).first()
+                if user is None:
+                    raise serializers.ValidationError({'email': 'This email is already registered.'})
+                user.set_password(validated_data['password'])
+                user.first_name = validated_data.get('first_name', '')
+                user.last_name = validated_data.get('last_name', '')
+                user.invited_at = None
+                user.save(update_fields=['password', 'first_name', 'last_name', 'invited_at'])
+            return user
         user = User.objects.create_user(
             username=validated_data['email'],
             email=validated_data['email'],
@@ -34,14 +65,16 @@ class UserRegisterSerializer(serializers.Serializer):
         )
         return user
 
-class ProjectMemberSerializer(serializers.ModelSerializer):
+class ProjectMemberSerializer(NormalizedUsersMixin, serializers.ModelSerializer):
+    user_fields = ['user']
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = ProjectMember
         fields = ['id', 'user', 'role', 'joined_at']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    user_fields = ['created_by']
     created_by = UserSerializer(read_only=True)
     members_count = serializers.SerializerMethodField()
     tasks_count = serializers.SerializerMethodField()
@@ -53,19 +86,41 @@ class ProjectSerializer(serializers.ModelSerializer):
                   'tasks_count', 'progress', 'is_archived', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
     
+    # List and detail querysets carry the counts (with_project_counts); other
+    # instances fall back to one query per count.
     def get_members_count(self, obj):
+        if hasattr(obj, 'num_members'):
+            return obj.num_members
         return obj.members.count()
     
     def get_tasks_count(self, obj):
+        if hasattr(obj, 'num_tasks'):
+            return obj.num_tasks - obj.num_done
         return obj.tasks.exclude(status='done').count()
     
     def get_progress(self, obj):
-        total = obj.tasks.count()
+        if hasattr(obj, 'num_tasks'):
+            total, done = obj.num_tasks, obj.num_done
+        else:
+            total = obj.tasks.count()
+            done = obj.tasks.filter(status='done').count() if total else 0
         if total == 0:
             return 0
-        done = obj.tasks.filter(status='done').count()
         return int((done / total) * 100)
 
+def member_count():
+    # Counted in a subquery: joining members next to tasks would build
+    # members x tasks rows per project before the aggregates run.
+    members = ProjectMember.objects.filter(project=OuterRef('pk')).order_by().values('project')
+    return Coalesce(Subquery(members.annotate(n=Count('pk')).values('n')), 0)
+
+def with_project_counts(queryset):
+    return queryset.select_related('created_by').annotate(
+        num_members=member_count(),
+        num_tasks=Count('tasks'),
+        num_done=Count('tasks', filter=Q(tasks__status='done')),
+    )
+
 class SprintSerializer(serializers.ModelSerializer):
     tasks_count = serializers.SerializerMethodField()
     completed_tasks = serializers.SerializerMethodField()
@@ -77,12 +132,23 @@ class SprintSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
     
     def get_tasks_count(self, obj):
+        if hasattr(obj, 'num_tasks'):
+            return obj.num_tasks
         return obj.tasks.count()
     
     def get_completed_tasks(self, obj):
+        if hasattr(obj, 'num_done'):
+            return obj.num_done
         return obj.tasks.filter(status='done').count()
 
-class TaskListSerializer(serializers.ModelSerializer):
+def with_sprint_counts(queryset):
+    return queryset.annotate(
+        num_tasks=Count('tasks', distinct=True),
+        num_done=Count('tasks', filter=Q(tasks__status='done'), distinct=True),
+    )
+
+class TaskListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    user_fields = ['reporter', 'assignee']
     reporter = UserSerializer(read_only=True)
     assignee = UserSerializer(read_only=True)
     project_key = serializers.CharField(source='project.key', read_only=True)
@@ -93,12 +159,25 @@ class TaskListSerializer(serializers.ModelSerializer):
         fields = ['id', 'project', 'project_key', 'title', 'description', 'task_type', 
                   'priority', 'status', 'reporter', 'assignee', 'sprint', 'story_points',
                   'estimated_hours', 'due_date', 'start_date', 'labels', 'order',
-                  'comments_count', 'created_at', 'updated_at', 'completed_at']
+                  'comments_count', 'created_at', 'updated_at', 'completed_at', 'version']
     
     def get_comments_count(self, obj):
+        if hasattr(obj, 'num_comments'):
+            return obj.num_comments
         return obj.comments.count()
 
-class TaskDetailSerializer(serializers.ModelSerializer):
+def with_task_list_relations(queryset):
+    # Everything TaskListSerializer reads, fetched with the tasks themselves.
+    # Aggregating drops Meta.ordering, so it is restated unless the caller
+    # already ordered the queryset.
+    if not queryset.query.order_by:
+        queryset = queryset.order_by(*Task._meta.ordering)
+    return queryset.select_related('project', 'reporter', 'assignee').annotate(
+        num_comments=Count('comments', distinct=True)
+    )
+
+class TaskDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    user_fields = ['reporter', 'assignee']
     reporter = UserSerializer(read_only=True)
     assignee = UserSerializer(read_only=True)
     project_key = serializers.CharField(source='project.key', read_only=True)
@@ -113,26 +192,38 @@ class TaskDetailSerializer(serializers.ModelSerializer):
                   'task_type', 'priority', 'status', 'reporter', 'assignee', 'sprint',
                   'sprint_name', 'parent_task', 'story_points', 'estimated_hours', 
                   'due_date', 'start_date', 'labels', 'order', 'comments', 'activity_logs',
-                  'created_at', 'updated_at', 'completed_at']
+                  'created_at', 'updated_at', 'completed_at', 'version']
     
     def get_comments(self, obj):
-        return CommentSerializer(obj.comments.all()[:10], many=True).data
+        return CommentSerializer(obj.comments.select_related('author')[:10], many=True, context=self._nested_context()).data
     
     def get_activity_logs(self, obj):
-        return ActivityLogSerializer(obj.activity_logs.all()[:20], many=True).data
+        return ActivityLogSerializer(obj.activity_logs.select_related('user')[:20], many=True, context=self._nested_context()).data
+    
+    def _nested_context(self):
+        if self.context.get('users') is None:
+            return {}
+        return {'users': self.context['users']}
 
 class TaskCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = ['id', 'project', 'title', 'description', 'task_type', 'priority', 
                   'status', 'assignee', 'sprint', 'parent_task', 'story_points',
-                  'estimated_hours', 'due_date', 'start_date', 'labels', 'order']
+                  'estimated_hours', 'due_date', 'start_date', 'labels', 'order', 'version']
+    
+    def validate_parent_task(self, value):
+        if value is not None and self.instance is not None:
+            if value.pk == self.instance.pk or str(self.instance.pk) in value.path.split('/'):
+                raise serializers.ValidationError('A task cannot be moved under itself or one of its subtasks.')
+        return value
     
     def create(self, validated_data):
         validated_data['reporter'] = self.context['request'].user
         return super().create(validated_data)
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    user_fields = ['author']
     author = UserSerializer(read_only=True)
     
     class Meta:
@@ -149,10 +240,23 @@ class AttachmentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Attachment
-        fields = ['id', 'task', 'file', 'filename', 'uploaded_by', 'uploaded_at']
-        read_only_fields = ['id', 'uploaded_by', 'uploaded_at']
+        fields = ['id', 'task', 'file', 'filename', 'content_type', 'size', 'uploaded_by', 'uploaded_at']
+        read_only_fields = ['id', 'file', 'content_type', 'size', 'uploaded_by', 'uploaded_at']
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AttachmentUpload
+        fields = ['id', 'task', 'filename', 'content_type', 'size', 'received', 'created_at']
+        read_only_fields = ['id', 'received', 'created_at']
+    
+    def validate_size(self, value):
+        limit = getattr(settings, 'ATTACHMENT_MAX_SIZE', 2 * 1024 ** 3)
+        if value < 0 or value > limit:
+            raise serializers.ValidationError(f'Attachments must be between 0 and {limit} bytes.')
+        return value
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class ActivityLogSerializer(NormalizedUsersMixin, serializers.ModelSerializer):
+    user_fields = ['user']
     user = UserSerializer(read_only=True)
     
     class Meta:
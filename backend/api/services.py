@@ -0,0 +1,124 @@
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .directory import invalidate_project_members
+from .journal import membership_entry, record_changes
+from .models import User, ProjectMember, Task, ActivityLog, ChangeJournal
+from .timeline import invalidate_timeline
+
+
+def complete_sprint(sprint, user, carry_over_to=None):
+    now = timezone.now()
+    to_sprint = carry_over_to.name if carry_over_to else ''
+
+    with transaction.atomic():
+        sprint.is_active = False
+        sprint.is_completed = True
+        sprint.end_date = now.date()
+        sprint.save(update_fields=['is_active', 'is_completed', 'end_date'])
+
+        # Task.save() is bypassed by the bulk updates below, so mirror what it
+        # would do: done tasks get a completion time, carried-over ones lose it,
+        # and both get a new version.
+        finished = list(Task.objects.filter(
+            sprint=sprint, status='done', completed_at__isnull=True
+        ).values_list('id', flat=True))
+        Task.objects.filter(pk__in=finished).update(completed_at=now, updated_at=now, version=F('version') + 1)
+        record_changes('task', finished, project_id=sprint.project_id)
+
+        incomplete = Task.objects.select_for_update().filter(sprint=sprint).exclude(status='done')
+        carried = list(incomplete.values_list('id', 'status'))
+        if not carried:
+            return 0
+
+        changes = {'sprint': carry_over_to, 'completed_at': None, 'updated_at': now, 'version': F('version') + 1}
+        if carry_over_to is None:
+            changes['status'] = 'backlog'
+        Task.objects.filter(sprint=sprint).exclude(status='done').update(**changes)
+        record_changes('task', [task_id for task_id, _ in carried], project_id=sprint.project_id)
+
+        logs = []
+        for task_id, old_status in carried:
+            logs.append(ActivityLog(
+                task_id=task_id,
+                user=user,
+                action_type='sprint_changed',
+                from_value=sprint.name,
+                to_value=to_sprint
+            ))
+            if carry_over_to is None and old_status != 'backlog':
+                logs.append(ActivityLog(
+                    task_id=task_id,
+                    user=user,
+                    action_type='status_changed',
+                    from_value=old_status,
+                    to_value='backlog'
+                ))
+        ActivityLog.objects.bulk_create(logs, batch_size=500)
+        # bulk_create() doesn't send post_save, so drop cached timelines here.
+        invalidate_timeline([task_id for task_id, _ in carried])
+
+    return len(carried)
+
+
+def add_project_members(project, emails, role='member'):
+    # Returns one {'email', 'status'} entry per input email, where status is
+    # 'added', 'invited' (account created, then added), 'already_member',
+    # 'invalid' or 'failed' (the email is taken as another user's username).
+    statuses = {}
+    wanted = {}
+    for email in emails:
+        email = email.strip() if isinstance(email, str) else ''
+        try:
+            validate_email(email)
+        except ValidationError:
+            statuses[email.upper()] = 'invalid'
+            continue
+        wanted.setdefault(email.upper(), email)
+
+    with transaction.atomic():
+        users = {}
+        for user in User.objects.by_emails(wanted).order_by('-id'):
+            users[user.email.upper()] = user
+
+        # Invited users get an unusable password, so nothing is hashed here;
+        # they set one when they register with the same email.
+        missing = [email for key, email in wanted.items() if key not in users]
+        if missing:
+            now = timezone.now()
+            User.objects.bulk_create([
+                User(username=email, email=email, role='employee', password=make_password(None), invited_at=now)
+                for email in missing
+            ], ignore_conflicts=True)
+            for user in User.objects.by_emails(missing).filter(username__in=missing):
+                key = user.email.upper()
+                users[key] = user
+                statuses[key] = 'invited'
+
+        existing = set(ProjectMember.objects.filter(
+            project=project, user__in=list(users.values())
+        ).values_list('user_id', flat=True))
+        added = [user for user in users.values() if user.id not in existing]
+        ProjectMember.objects.bulk_create([
+            ProjectMember(project=project, user=user, role=role) for user in added
+        ], ignore_conflicts=True)
+        ChangeJournal.objects.bulk_create([membership_entry(project.id, user.id) for user in added])
+
+    for key in wanted:
+        if key not in users:
+            statuses[key] = 'failed'
+        elif users[key].id in existing:
+            statuses[key] = 'already_member'
+        else:
+            statuses.setdefault(key, 'added')
+
+    # bulk_create() skips the post_save signal that normally does this.
+    invalidate_project_members([project.id])
+    return [
+        {'email': email, 'status': statuses[(email.strip() if isinstance(email, str) else '').upper()]}
+        for email in emails
+    ]
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .avatars import schedule_thumbnails
+from .directory import invalidate_project_members, invalidate_user_projects
+from .journal import journal_entry, membership_entry
+from .models import (
+    ActivityLog, ChangeJournal, Comment, Notification, Project, ProjectMember, Sprint, Task, User, adjust_rollups,
+    tree_contribution
+)
+from .timeline import invalidate_timeline
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_caches(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def refresh_avatar_thumbnails(sender, instance, **kwargs):
+    if (instance.avatar.name or '') != (instance.avatar_thumbnails or {}).get('source', ''):
+        transaction.on_commit(lambda: schedule_thumbnails(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_directory(sender, instance, created, **kwargs):
+    # Deleted users leave their projects through the ProjectMember cascade.
+    if not created:
+        invalidate_user_projects(instance.pk)
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_member_caches(sender, instance, **kwargs):
+    invalidate_project_members([instance.project_id])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=ActivityLog)
+@receiver(post_delete, sender=ActivityLog)
+def invalidate_task_timeline(sender, instance, **kwargs):
+    invalidate_timeline([instance.task_id])
+
+
+@receiver(post_delete, sender=Task)
+def remove_from_rollups(sender, instance, **kwargs):
+    # Cascaded subtasks are deleted one by one too, so each row only takes
+    # its own contribution off its ancestors.
+    adjust_rollups(instance.path, [-value for value in tree_contribution(
+        instance.story_points, instance.estimated_hours, instance.status
+    )])
+
+
+# Rows deleted along with one of these need no tombstone: sync clients drop a
+# task's comments with the task, and a project's contents with the project.
+JOURNAL_CASCADES = {
+    Task: (Project,),
+    Comment: (Task, Project),
+    Sprint: (Project,),
+    Notification: (User,),
+}
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Sprint)
+@receiver(post_save, sender=Notification)
+def journal_save(sender, instance, created, **kwargs):
+    entries = [journal_entry(instance)]
+    if created and sender is Comment:
+        # The task's comments_count changed with it.
+        entries.append(journal_entry(instance.task))
+    ChangeJournal.objects.bulk_create(entries)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Sprint)
+@receiver(post_delete, sender=Notification)
+def journal_delete(sender, instance, origin=None, **kwargs):
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model in JOURNAL_CASCADES[sender]:
+        return
+    entries = [journal_entry(instance, deleted=True)]
+    if sender is Comment:
+        entries.append(journal_entry(instance.task))
+    ChangeJournal.objects.bulk_create(entries)
+
+
+@receiver(post_save, sender=ProjectMember)
+def journal_joined(sender, instance, created, **kwargs):
+    if created:
+        membership_entry(instance.project_id, instance.user_id).save()
+
+
+@receiver(post_delete, sender=ProjectMember)
+def journal_left(sender, instance, **kwargs):
+    membership_entry(instance.project_id, instance.user_id, deleted=True).save()
@@ -0,0 +1,309 @@
+from django.core.files.storage import default_storage
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import User
+
+USER_COLUMNS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'role', 'avatar', 'avatar_thumbnails', 'created_at'
+]
+
+
+def requested_names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+
+def _datetime(value):
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _decimal(value):
+    return '{:f}'.format(value) if value is not None else None
+
+
+def _file_url(value, request=None):
+    if not value:
+        return None
+    url = default_storage.url(value)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+class Column:
+    def __init__(self, lookup, convert=None):
+        self.lookup = lookup
+        self.convert = convert
+
+
+class UserColumn(Column):
+    pass
+
+
+class Aggregate:
+    def __init__(self, expression):
+        self.expression = expression
+
+
+class Derived:
+    def __init__(self, func, **requires):
+        self.func = func
+        self.requires = requires
+
+
+class SparseFieldSet:
+    # Dict-based serialization for read-only list views. Rows come straight
+    # from .values() so no model instances or DRF fields are involved.
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def parse(self, request):
+        names = requested_names(request, 'fields')
+        if names is None:
+            return None
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+        expand = requested_names(request, 'expand') or []
+        return names, [name for name in expand if name in names and isinstance(self.fields[name], UserColumn)]
+
+    def rows(self, queryset, names):
+        # Always select the pk so DISTINCT querysets never collapse rows.
+        lookups = {'id'}
+        annotations = {}
+        for name in names:
+            field = self.fields[name]
+            if isinstance(field, Column):
+                lookups.add(field.lookup)
+            elif isinstance(field, Aggregate):
+                annotations[f'_sparse_{name}'] = field.expression
+            else:
+                for alias, expression in field.requires.items():
+                    annotations[f'_sparse_{alias}'] = expression
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset.values(*lookups, *annotations)
+
+    def serialize(self, queryset, names, expand=(), request=None, users=None):
+        # When a users set is passed the response is normalized: user columns
+        # stay ids and are collected instead of being expanded inline.
+        rows = list(self.rows(queryset, names))
+        if users is not None:
+            expand = ()
+        expanded = self._expanded_users(rows, expand, request)
+        data = []
+        for row in rows:
+            item = {}
+            for name in names:
+                field = self.fields[name]
+                if isinstance(field, Derived):
+                    value = field.func(*(row[f'_sparse_{alias}'] for alias in field.requires))
+                elif isinstance(field, Aggregate):
+                    value = row[f'_sparse_{name}']
+                else:
+                    value = row[field.lookup]
+                    if name in expand:
+                        value = expanded.get(value)
+                    elif users is not None and isinstance(field, UserColumn):
+                        if value is not None:
+                            users.add(value)
+                    elif field.convert is not None:
+                        value = field.convert(value)
+                item[name] = value
+            data.append(item)
+        return data
+
+    def _expanded_users(self, rows, expand, request):
+        ids = {row[self.fields[name].lookup] for name in expand for row in rows}
+        ids.discard(None)
+        if not ids:
+            return {}
+        return {
+            user['id']: serialize_user(user, request)
+            for user in User.objects.filter(pk__in=ids).values(*USER_COLUMNS)
+        }
+
+
+def thumbnail_urls(thumbnails, avatar_name, request=None):
+    # {size: {format: url}}; None until thumbnails exist for the current
+    # avatar.
+    if not thumbnails or thumbnails.get('source') != avatar_name:
+        return None
+    return {
+        size: {fmt: _file_url(name, request) for fmt, name in formats.items()}
+        for size, formats in thumbnails['sizes'].items()
+    }
+
+
+def serialize_user(row, request=None):
+    user = dict(row)
+    user['avatar_thumbnails'] = thumbnail_urls(user['avatar_thumbnails'], user['avatar'], request)
+    user['avatar'] = _file_url(user['avatar'], request)
+    user['created_at'] = _datetime(user['created_at'])
+    return user
+
+
+def _progress(total, done):
+    return int((done / total) * 100) if total else 0
+
+
+TASK_FIELDS = SparseFieldSet(
+    id=Column('id'),
+    project=Column('project_id'),
+    project_key=Column('project__key'),
+    title=Column('title'),
+    description=Column('description'),
+    task_type=Column('task_type'),
+    priority=Column('priority'),
+    status=Column('status'),
+    reporter=UserColumn('reporter_id'),
+    assignee=UserColumn('assignee_id'),
+    sprint=Column('sprint_id'),
+    parent_task=Column('parent_task_id'),
+    story_points=Column('story_points'),
+    estimated_hours=Column('estimated_hours', _decimal),
+    due_date=Column('due_date', _date),
+    start_date=Column('start_date', _date),
+    labels=Column('labels'),
+    order=Column('order'),
+    comments_count=Aggregate(Count('comments', distinct=True)),
+    created_at=Column('created_at', _datetime),
+    updated_at=Column('updated_at', _datetime),
+    completed_at=Column('completed_at', _datetime),
+    version=Column('version'),
+)
+
+PROJECT_FIELDS = SparseFieldSet(
+    id=Column('id'),
+    name=Column('name'),
+    key=Column('key'),
+    description=Column('description'),
+    created_by=UserColumn('created_by_id'),
+    members_count=Aggregate(Count('members', distinct=True)),
+    tasks_count=Aggregate(Count('tasks', filter=~Q(tasks__status='done'), distinct=True)),
+    progress=Derived(
+        _progress,
+        total=Count('tasks', distinct=True),
+        done=Count('tasks', filter=Q(tasks__status='done'), distinct=True),
+    ),
+    is_archived=Column('is_archived'),
+    created_at=Column('created_at', _datetime),
+    updated_at=Column('updated_at', _datetime),
+)
+
+COMMENT_FIELDS = SparseFieldSet(
+    id=Column('id'),
+    task=Column('task_id'),
+    author=UserColumn('author_id'),
+    content=Column('content'),
+    created_at=Column('created_at', _datetime),
+    updated_at=Column('updated_at', _datetime),
+)
+
+
+class UserReferenceField(serializers.ReadOnlyField):
+    # Emits the raw foreign key and records it for the side-loaded users map.
+
+    def to_representation(self, value):
+        if value is not None:
+            self.context['users'].add(value)
+        return value
+
+
+class NormalizedUsersMixin:
+    # With a 'users' set in the context, nested user objects are replaced by
+    # their ids and collected so the view can emit a single users map.
+    user_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('users') is None:
+            return
+        for name in self.user_fields:
+            if name in self.fields:
+                self.fields[name] = UserReferenceField(source=f'{name}_id')
+
+
+class SparseFieldsSerializerMixin(NormalizedUsersMixin):
+    # Applies ?fields=/?expand= to the regular serializer path (retrieve and
+    # friends). Unexpanded user relations collapse to their ids.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        names = requested_names(request, 'fields')
+        if names is None:
+            return
+        expand = requested_names(request, 'expand') or []
+        for name in set(self.fields) - set(names):
+            self.fields.pop(name)
+        for name in self.user_fields:
+            if name in self.fields and name not in expand and not isinstance(self.fields[name], UserReferenceField):
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
+def normalize_requested(request):
+    return request.query_params.get('normalize') == 'users'
+
+
+def sideload_users(ids, request=None):
+    if not ids:
+        return {}
+    return {
+        str(user['id']): serialize_user(user, request)
+        for user in User.objects.filter(pk__in=ids).values(*USER_COLUMNS)
+    }
+
+
+def with_users(data, users, request=None):
+    payload = {'results': data} if isinstance(data, list) else dict(data)
+    payload['users'] = sideload_users(users, request)
+    return payload
+
+
+class SparseFieldsMixin:
+    sparse_fields = None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.request.method == 'GET' and normalize_requested(self.request):
+            context['users'] = set()
+        return context
+
+    def list(self, request, *args, **kwargs):
+        sparse = self.sparse_fields.parse(request) if self.sparse_fields else None
+        if sparse is None and not normalize_requested(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        if sparse is None:
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(with_users(serializer.data, serializer.context['users'], request))
+        users = set() if normalize_requested(request) else None
+        data = self.sparse_fields.serialize(queryset, *sparse, request=request, users=users)
+        return Response(data if users is None else with_users(data, users, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not normalize_requested(request):
+            return super().retrieve(request, *args, **kwargs)
+        serializer = self.get_serializer(self.get_object())
+        return Response(with_users(serializer.data, serializer.context['users'], request))
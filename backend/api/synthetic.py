@@ -0,0 +1,322 @@
+import random
+import re
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ActivityLog, BehavioralEvent, Comment, Notification, Project, ProjectMember, Sprint, Task, TimeEntry, User,
+    tree_contribution
+)
+
+STATUS_FLOW = ['backlog', 'todo', 'in_progress', 'review', 'done']
+STATUS_WEIGHTS = [15, 20, 15, 10, 40]
+PRIORITY_WEIGHTS = {'low': 25, 'medium': 45, 'high': 22, 'critical': 8}
+TYPE_WEIGHTS = {'story': 30, 'task': 40, 'bug': 22, 'epic': 8}
+STORY_POINTS = [None, 1, 2, 3, 5, 8, 13]
+LABELS = ['backend', 'frontend', 'api', 'ux', 'perf', 'infra', 'docs', 'mobile', 'security', 'data']
+# Comments per task: most tasks get none or a couple, a few get long threads.
+COMMENT_COUNTS = [0, 1, 2, 3, 5, 8, 13]
+COMMENT_WEIGHTS = [35, 20, 15, 12, 10, 6, 2]
+SUBTASK_SHARE = 0.1
+SPRINT_DAYS = 14
+BATCH_SIZE = 1000
+
+WORDS = (
+    'sync export invoice login board filter cache search report upload webhook billing onboarding '
+    'dashboard timeline calendar sprint backlog import audit permissions profile avatar email settings'
+).split()
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    # bulk_create still runs pre_save, which would stamp every auto_now(_add)
+    # field with the current time and flatten the generated history.
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Generator:
+    def __init__(self, org, seed, now, history_days):
+        self.org = org
+        self.rng = random.Random(f'{org}:{seed}')
+        self.now = now
+        self.history_days = history_days
+
+    def working_time(self, day):
+        # Activity clusters around office hours with a lunch dip.
+        hour = self.rng.choices(range(24), weights=[
+            0, 0, 0, 0, 0, 0, 1, 2, 6, 10, 12, 11, 6, 8, 11, 11, 9, 6, 3, 2, 2, 1, 1, 0,
+        ])[0]
+        moment = datetime.combine(day, time(hour, self.rng.randrange(60), self.rng.randrange(60)))
+        return min(timezone.make_aware(moment), self.now)
+
+    def after(self, moment, mean_hours):
+        return min(moment + timedelta(hours=self.rng.expovariate(1 / mean_hours)), self.now)
+
+    def title(self):
+        words = self.rng.sample(WORDS, 3)
+        return f'{words[0].capitalize()} {words[1]} {words[2]}'
+
+    def weighted(self, weights):
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _project_prefix(org):
+    letters = re.sub(r'[^A-Za-z0-9]', '', org).upper()
+    return letters[:4] or 'SYN'
+
+
+def seed_org(org='synthetic', users=50, projects=10, tasks_per_project=200, seed=0, history_days=120,
+             password='password', now=None):
+    # Builds one self-contained organisation with bulk_create. The same org,
+    # sizes and seed always produce the same rows, so benchmark runs against
+    # different commits compare like with like.
+    gen = Generator(org, seed, now or timezone.now(), history_days)
+    rng = gen.rng
+    start = gen.now - timedelta(days=history_days)
+    today = timezone.localdate(gen.now)
+
+    with transaction.atomic(), _explicit_timestamps(
+        User, Project, ProjectMember, Sprint, Task, Comment, ActivityLog, BehavioralEvent, TimeEntry, Notification
+    ):
+        hashed = make_password(password)
+        people = User.objects.bulk_create([
+            User(
+                username=f'{org}-user{i}@example.com',
+                email=f'{org}-user{i}@example.com',
+                password=hashed,
+                first_name=f'User{i}',
+                last_name=org.capitalize(),
+                role='scrum_master' if i % 8 == 0 else 'employee',
+                created_at=start - timedelta(days=rng.randrange(30)),
+            )
+            for i in range(users)
+        ], batch_size=BATCH_SIZE)
+        managers = [user for user in people if user.role == 'scrum_master'] or people
+
+        prefix = _project_prefix(org)
+        boards = Project.objects.bulk_create([
+            Project(
+                name=f'{org.capitalize()} {gen.title()}',
+                key=f'{prefix}{i}',
+                description=f'Synthetic project {i} of {org}',
+                created_by=rng.choice(managers),
+                created_at=start,
+                updated_at=start,
+            )
+            for i in range(projects)
+        ], batch_size=BATCH_SIZE)
+
+        members, memberships = {}, []
+        for project in boards:
+            team = rng.sample(people, min(len(people), rng.randint(5, 15)))
+            if project.created_by not in team:
+                team.append(project.created_by)
+            members[project.pk] = team
+            memberships.extend(
+                ProjectMember(
+                    project=project, user=user, joined_at=start,
+                    role='admin' if user == project.created_by else 'member',
+                )
+                for user in team
+            )
+        ProjectMember.objects.bulk_create(memberships, batch_size=BATCH_SIZE)
+
+        # Per project: sprints finished in the past, the active one and a
+        # planned one.
+        sprints = []
+        first_start = today - timedelta(days=SPRINT_DAYS * 3)
+        for project in boards:
+            for index in range(4):
+                sprint_start = first_start + timedelta(days=SPRINT_DAYS * index)
+                sprints.append(Sprint(
+                    project=project, name=f'Sprint {index + 1}', goal=gen.title(),
+                    start_date=sprint_start, end_date=sprint_start + timedelta(days=SPRINT_DAYS - 1),
+                    is_completed=index < 2, is_active=index == 2, created_at=start,
+                ))
+        Sprint.objects.bulk_create(sprints, batch_size=BATCH_SIZE)
+        sprints_by_project = {}
+        for sprint in sprints:
+            sprints_by_project.setdefault(sprint.project_id, []).append(sprint)
+
+        tasks, histories = [], {}
+        for project in boards:
+            team = members[project.pk]
+            past, past_two, active, planned = sprints_by_project[project.pk]
+            for order in range(tasks_per_project):
+                created = gen.working_time(start.date() + timedelta(days=rng.randrange(history_days)))
+                final = rng.choices(STATUS_FLOW, weights=STATUS_WEIGHTS)[0]
+                flow = STATUS_FLOW[:STATUS_FLOW.index(final) + 1] if final == 'backlog' else \
+                    STATUS_FLOW[1:STATUS_FLOW.index(final) + 1]
+                moments = [created]
+                for _ in flow[1:]:
+                    moments.append(gen.after(moments[-1], 36))
+                if final == 'backlog':
+                    sprint = None
+                elif final == 'done':
+                    sprint = rng.choice([past, past_two, active])
+                else:
+                    sprint = active if rng.random() < 0.7 else planned
+                assignee = rng.choice(team) if rng.random() < 0.9 else None
+                task = Task(
+                    project=project,
+                    title=gen.title(),
+                    description=' '.join(rng.choices(WORDS, k=rng.randint(0, 40))),
+                    task_type=gen.weighted(TYPE_WEIGHTS),
+                    priority=gen.weighted(PRIORITY_WEIGHTS),
+                    status=final,
+                    reporter=rng.choice(team),
+                    assignee=assignee,
+                    sprint=sprint,
+                    story_points=rng.choice(STORY_POINTS),
+                    estimated_hours=Decimal(rng.choice([0, 1, 2, 4, 6, 8, 16])) or None,
+                    due_date=today + timedelta(days=rng.randint(-45, 45)) if rng.random() < 0.7 else None,
+                    start_date=created.date() if final != 'backlog' else None,
+                    labels=rng.sample(LABELS, rng.randint(0, 3)),
+                    order=order,
+                    created_at=created,
+                    updated_at=moments[-1],
+                    completed_at=moments[-1] if final == 'done' else None,
+                )
+                tasks.append(task)
+                histories[id(task)] = list(zip(flow, moments))
+
+        # A slice of tasks becomes sub-tasks of an earlier story or epic in the
+        # same project, so tree paths and rollups have something to sum.
+        parents = {}
+        for task in tasks:
+            if task.task_type in ('story', 'epic'):
+                parents.setdefault(task.project.pk, []).append(task)
+        roots, children = [], []
+        for task in tasks:
+            candidates = parents.get(task.project.pk)
+            if task.task_type not in ('story', 'epic') and candidates and rng.random() < SUBTASK_SHARE:
+                task.task_type = 'subtask'
+                task.parent_task = rng.choice(candidates)
+                children.append(task)
+            else:
+                roots.append(task)
+        Task.objects.bulk_create(roots, batch_size=BATCH_SIZE)
+        for task in children:
+            task.path = f'{task.parent_task.pk}/'
+        Task.objects.bulk_create(children, batch_size=BATCH_SIZE)
+
+        rolled = {}
+        for task in children:
+            totals = rolled.setdefault(task.parent_task.pk, [task.parent_task, [0, 0, 0, 0]])[1]
+            for index, value in enumerate(tree_contribution(task.story_points, task.estimated_hours, task.status)):
+                totals[index] += value
+        for parent, totals in rolled.values():
+            for field, value in zip(Task.ROLLUP_FIELDS, totals):
+                setattr(parent, field, value)
+        Task.objects.bulk_update([parent for parent, _ in rolled.values()], Task.ROLLUP_FIELDS, batch_size=BATCH_SIZE)
+
+        comments, logs, events, entries, notifications = [], [], [], [], []
+        for task in tasks:
+            team = members[task.project.pk]
+            history = histories[id(task)]
+            logs.append(ActivityLog(task=task, user=task.reporter, action_type='created', timestamp=task.created_at))
+            events.append(BehavioralEvent(
+                user=task.reporter, task=task, project=task.project, event_type='task_created',
+                timestamp=task.created_at,
+            ))
+            if task.assignee is not None:
+                logs.append(ActivityLog(
+                    task=task, user=task.reporter, action_type='assigned',
+                    to_value=task.assignee.email, timestamp=task.created_at,
+                ))
+                notifications.append(Notification(
+                    user=task.assignee, task=task, notification_type='task_assigned',
+                    title='Task assigned', message=f'You were assigned to {task.title}',
+                    is_read=rng.random() < 0.7, created_at=task.created_at,
+                ))
+            actor = task.assignee or task.reporter
+            for (previous, _), (current, moment) in zip(history, history[1:]):
+                logs.append(ActivityLog(
+                    task=task, user=actor, action_type='status_changed',
+                    from_value=previous, to_value=current, timestamp=moment,
+                ))
+                events.append(BehavioralEvent(
+                    user=actor, task=task, project=task.project, event_type='status_drag_drop',
+                    metadata={'from': previous, 'to': current}, timestamp=moment,
+                ))
+            if task.status == 'done':
+                events.append(BehavioralEvent(
+                    user=actor, task=task, project=task.project, event_type='task_completed',
+                    timestamp=task.completed_at,
+                ))
+
+            for _ in range(rng.randint(0, 4)):
+                opened = gen.working_time(task.created_at.date() + timedelta(days=rng.randrange(7)))
+                events.append(BehavioralEvent(
+                    user=rng.choice(team), task=task, project=task.project, event_type='task_opened',
+                    duration_seconds=rng.randint(5, 600), timestamp=opened,
+                ))
+
+            for _ in range(rng.choices(COMMENT_COUNTS, weights=COMMENT_WEIGHTS)[0]):
+                author = rng.choice(team)
+                moment = gen.after(task.created_at, 48)
+                comments.append(Comment(
+                    task=task, author=author, content=' '.join(rng.choices(WORDS, k=rng.randint(3, 30))),
+                    created_at=moment, updated_at=moment,
+                ))
+                events.append(BehavioralEvent(
+                    user=author, task=task, project=task.project, event_type='comment_added', timestamp=moment,
+                ))
+
+            if task.assignee is not None and STATUS_FLOW.index(task.status) >= STATUS_FLOW.index('in_progress'):
+                started = dict(history)['in_progress']
+                for _ in range(rng.randint(1, 4)):
+                    begin = gen.working_time(started.date() + timedelta(days=rng.randrange(5)))
+                    seconds = rng.randint(15 * 60, 3 * 3600)
+                    end = begin + timedelta(seconds=seconds)
+                    entries.append(TimeEntry(
+                        user=task.assignee, task=task, description=gen.title(), start_time=begin,
+                        end_time=end, duration_seconds=seconds, created_at=begin,
+                    ))
+                    events.append(BehavioralEvent(
+                        user=task.assignee, task=task, project=task.project, event_type='started_timer',
+                        timestamp=begin,
+                    ))
+                    events.append(BehavioralEvent(
+                        user=task.assignee, task=task, project=task.project, event_type='stopped_timer',
+                        duration_seconds=seconds, timestamp=end,
+                    ))
+
+        Comment.objects.bulk_create(comments, batch_size=BATCH_SIZE)
+        ActivityLog.objects.bulk_create(logs, batch_size=BATCH_SIZE)
+        BehavioralEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+        TimeEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+        Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+
+    return {
+        'users': people,
+        'projects': boards,
+        'sprints': sprints,
+        'tasks': tasks,
+        'comments': comments,
+        'activity_logs': logs,
+        'behavioral_events': events,
+        'time_entries': entries,
+        'notifications': notifications,
+    }
+
+
+def delete_org(org):
+    # Projects, tasks and everything hanging off them cascade from the users.
+    return User.objects.filter(email__startswith=f'{org}-user', email__endswith='@example.com').delete()[0]
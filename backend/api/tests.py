@@ -1,3 +1,692 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import traceback
+from collections import Counter, defaultdict
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import db_routers, urls
+from .behavior import median_status_seconds
+from .directory import search_users
+from .flow import process_status_changes
+from .journal import prune_journal
+from .metrics import fingerprint
+from .models import (
+    ActivityLog, Attachment, AttachmentUpload, ChangeJournal, Comment, Notification, ProjectMember, Task,
+    TaskStatusInterval, TimeEntry, User
+)
+from .synthetic import seed_org
+from .throttling import TokenBucketThrottle
+from .tokens import TaskFlowRefreshToken, blacklist_token
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+# Instrumentation that wraps views and serializers, never the real caller.
+SKIPPED_FRAMES = {os.path.abspath(__file__), os.path.join(API_DIR, 'metrics.py')}
+MEDIA_ROOT = tempfile.mkdtemp(prefix='taskflow-tests-')
+
+SMALL = {'users': 6, 'projects': 2, 'tasks_per_project': 8}
+LARGE = {'users': 16, 'projects': 4, 'tasks_per_project': 24}
+
+# (url name, method, path, payload); paths and payloads are formatted with
+# the graph's context, payload callables receive the context.
+CASES = [
+    ('api-root', 'get', '/api/', None),
+    ('health_check', 'get', '/api/health/', None),
+    ('register', 'post', '/api/auth/register/', {'email': 'new-{size}@example.com', 'password': 'long enough password'}),
+    ('login', 'post', '/api/auth/login/', {'email': '{email}', 'password': 'password'}),
+    ('logout', 'post', '/api/auth/logout/', lambda context: {'refresh': str(TaskFlowRefreshToken.for_user(context['viewer']))}),
+    ('token_refresh', 'post', '/api/auth/refresh/', lambda context: {'refresh': str(TaskFlowRefreshToken.for_user(context['viewer']))}),
+    ('user_profile', 'get', '/api/users/me/', None),
+    ('users_list', 'get', '/api/users/', None),
+    ('users_list', 'get', '/api/users/?project={project}', None),
+    ('log_event', 'post', '/api/analytics/events/', {'event_type': 'task_opened', 'task': '{task}', 'project': '{project}'}),
+    ('dashboard_stats', 'get', '/api/dashboard/stats/', None),
+    ('analytics_data', 'get', '/api/analytics/data/?days=30', None),
+    ('productivity_profile', 'get', '/api/analytics/profile/', None),
+    ('cycle_time', 'get', '/api/analytics/cycle-time/?project={project}', None),
+    ('calendar_tasks', 'get', '/api/calendar/tasks/?view=month', None),
+    ('calendar_tasks', 'get', '/api/calendar/tasks/?view=agenda&start={start}', None),
+    ('calendar_tasks', 'get', '/api/calendar/tasks/?month={month}&year={year}', None),
+    ('team_stats', 'get', '/api/team/stats/', None),
+    ('project-list', 'get', '/api/projects/', None),
+    ('project-list', 'get', '/api/projects/?fields=id,name,members_count,progress&expand=created_by', None),
+    ('project-list', 'post', '/api/projects/', {'name': 'Another', 'key': 'NEW{size}'}),
+    ('project-detail', 'get', '/api/projects/{project}/', None),
+    ('project-detail', 'patch', '/api/projects/{project}/', {'description': 'Updated'}),
+    ('project-members', 'get', '/api/projects/{project}/members/', None),
+    ('project-add-member', 'post', '/api/projects/{project}/add_member/', {'email': 'member-{size}@example.com'}),
+    ('project-add-members', 'post', '/api/projects/{project}/add_members/',
+     {'emails': ['a-{size}@example.com', 'b-{size}@example.com', '{email}']}),
+    ('project-board', 'get', '/api/projects/{project}/board/', None),
+    ('project-board', 'get', '/api/projects/{project}/board/?normalize=users', None),
+    ('project-board', 'get', '/api/projects/{project}/board/?fields=id,title,assignee&expand=assignee', None),
+    ('project-backlog', 'get', '/api/projects/{project}/backlog/', None),
+    ('sprint-list', 'get', '/api/sprints/', None),
+    ('sprint-list', 'get', '/api/sprints/?project={project}', None),
+    ('sprint-detail', 'get', '/api/sprints/{sprint}/', None),
+    ('sprint-start', 'post', '/api/sprints/{planned_sprint}/start/', None),
+    ('sprint-complete', 'post', '/api/sprints/{sprint}/complete/', {'carry_over_to': '{planned_sprint}'}),
+    ('task-list', 'get', '/api/tasks/', None),
+    ('task-list', 'get', '/api/tasks/?project={project}&normalize=users', None),
+    ('task-list', 'get', '/api/tasks/?fields=id,title,comments_count,reporter&expand=reporter', None),
+    ('task-list', 'post', '/api/tasks/', {'project': '{project}', 'title': 'New task', 'parent_task': '{parent}'}),
+    ('task-detail', 'get', '/api/tasks/{task}/', None),
+    ('task-detail', 'get', '/api/tasks/{task}/?normalize=users', None),
+    ('task-detail', 'patch', '/api/tasks/{task}/', {'status': 'review', 'assignee': '{user}'}),
+    ('task-detail', 'delete', '/api/tasks/{leaf}/', None),
+    ('task-move', 'post', '/api/tasks/{task}/move/', {'status': 'done', 'order': 3}),
+    ('task-tree', 'get', '/api/tasks/{parent}/tree/', None),
+    ('task-timeline', 'get', '/api/tasks/{task}/timeline/', None),
+    ('comment-list', 'get', '/api/comments/', None),
+    ('comment-list', 'get', '/api/comments/?task={task}', None),
+    ('comment-list', 'post', '/api/comments/', {'task': '{task}', 'content': 'Looks good'}),
+    ('comment-detail', 'get', '/api/comments/{comment}/', None),
+    ('attachment-list', 'get', '/api/attachments/?task={task}', None),
+    ('attachment-detail', 'get', '/api/attachments/{attachment}/', None),
+    ('attachment-download', 'get', '/api/attachments/{attachment}/download/', None),
+    ('attachment-start-upload', 'post', '/api/attachments/uploads/', {'task': '{task}', 'filename': 'a.txt', 'size': 10}),
+    ('attachment-upload', 'get', '/api/attachments/uploads/{upload}/', None),
+    ('time-entry-list', 'get', '/api/time-entries/', None),
+    ('time-entry-list', 'post', '/api/time-entries/', {'task': '{task}', 'start_time': '{now}', 'is_running': True}),
+    ('time-entry-detail', 'get', '/api/time-entries/{time_entry}/', None),
+    ('time-entry-stop', 'post', '/api/time-entries/{running_entry}/stop/', None),
+    ('notification-list', 'get', '/api/notifications/', None),
+    ('notification-detail', 'get', '/api/notifications/{notification}/', None),
+    ('notification-mark-all-read', 'post', '/api/notifications/mark_all_read/', None),
+    ('sync', 'get', '/api/sync/', None),
+    ('sync', 'get', '/api/sync/?since=0&normalize=users', None),
+    ('batch', 'post', '/api/batch/', {'requests': [
+        {'path': '/api/dashboard/stats/'},
+        {'path': '/api/projects/'},
+        {'path': '/api/notifications/'},
+        {'path': '/api/users/me/'},
+        {'path': '/api/users/'},
+        {'method': 'PATCH', 'path': '/api/tasks/{task}/', 'body': {'status': 'review'}},
+        {'path': '/api/tasks/?project={project}'},
+    ]}),
+]
+
+
+def _url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+def _fill(value, context):
+    if callable(value):
+        return value(context)
+    if isinstance(value, str):
+        return value.format(**context)
+    if isinstance(value, list):
+        return [_fill(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, context) for key, item in value.items()}
+    return value
+
+
+def call_site():
+    # Innermost frame in this app, i.e. the view or serializer line that
+    # triggered the query.
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(API_DIR) and frame.filename not in SKIPPED_FRAMES:
+            return f'{os.path.relpath(frame.filename, os.path.dirname(API_DIR))}:{frame.lineno} in {frame.name}'
+    return '<outside api>'
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((call_site(), fingerprint(sql)))
+        return execute(sql, params, many, context)
+
+
+def describe(small, large):
+    counts = defaultdict(lambda: [0, 0])
+    for index, recorder in enumerate((small, large)):
+        for key in recorder.queries:
+            counts[key][index] += 1
+    by_site = defaultdict(list)
+    for (site, statement), pair in counts.items():
+        by_site[site].append((pair, statement))
+    lines = []
+    for site, statements in sorted(by_site.items()):
+        lines.append(f'  {site}')
+        for (in_small, in_large), statement in sorted(statements, key=lambda item: item[0][0] - item[0][1]):
+            marker = '!' if in_small != in_large else ' '
+            lines.append(f'   {marker} {in_small:>4} -> {in_large:<4} {statement[:300]}')
+    return '\n'.join(lines)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-count-tests'}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    MEDIA_ROOT=MEDIA_ROOT,
+    AVATAR_THUMBNAILS_ASYNC=False,
+    METRICS_QUERY_THRESHOLD=10 ** 6,
+    SYNC_LAG_SECONDS=0,
+    BATCH_MAX_WORKERS=1,
+)
+class QueryCountTests(TestCase):
+    # Every endpoint must run the same number of queries whatever the size of
+    # the data behind it, so an N+1 shows up as a failing count.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.graphs = {'small': cls.build_graph('small', SMALL), 'large': cls.build_graph('large', LARGE)}
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def build_graph(cls, size, sizes):
+        created = seed_org(size, seed=1, **sizes)
+        projects = created['projects']
+        project = projects[0]
+        viewer = project.created_by
+        ProjectMember.objects.bulk_create(
+            [ProjectMember(project=other, user=viewer) for other in projects], ignore_conflicts=True
+        )
+
+        tasks = created['tasks']
+        now = timezone.now()
+        mine = tasks[::3]
+        Task.objects.filter(pk__in=[task.pk for task in mine]).update(assignee=viewer)
+        TimeEntry.objects.bulk_create([
+            TimeEntry(user=viewer, task=task, start_time=now - timedelta(hours=2), end_time=now, duration_seconds=3600)
+            for task in mine
+        ])
+        Notification.objects.bulk_create([
+            Notification(user=viewer, task=task, notification_type='task_assigned', title='Assigned', message=task.title)
+            for task in mine
+        ])
+
+        parent = Task.objects.filter(project=project, subtasks__isnull=False).first()
+        parent = parent or Task.objects.filter(project=project).first()
+        task = Task.objects.filter(project=project, parent_task=None).exclude(pk=parent.pk).first()
+        # Deletes cascade per related table, so the deleted task has the same
+        # kinds of rows in both graphs.
+        leaf = Task.objects.create(project=project, title='Leaf', reporter=viewer, assignee=viewer)
+        Comment.objects.create(task=leaf, author=viewer, content='Soon gone')
+
+        name = default_storage.save(f'attachments/{size}.txt', ContentFile(b'attachment'))
+        attachments = Attachment.objects.bulk_create([
+            Attachment(task=task, file=name, filename=f'{index}.txt', size=10, uploaded_by=viewer)
+            for index in range(len(projects))
+        ])
+        upload = AttachmentUpload.objects.create(task=task, uploaded_by=viewer, filename='part.txt', size=10)
+        running = TimeEntry.objects.create(user=viewer, task=task, start_time=now - timedelta(hours=1), is_running=True)
+
+        sprints = [sprint for sprint in created['sprints'] if sprint.project_id == project.pk]
+        return {
+            'size': size,
+            'viewer': viewer,
+            'email': viewer.email,
+            'user': created['users'][-1].pk,
+            'project': project.pk,
+            'sprint': next(sprint.pk for sprint in sprints if sprint.is_active),
+            'planned_sprint': next(sprint.pk for sprint in sprints if not sprint.is_active and not sprint.is_completed),
+            'task': task.pk,
+            'parent': parent.pk,
+            'leaf': leaf.pk,
+            'comment': next(comment.pk for comment in created['comments'] if comment.task.project_id == project.pk),
+            'attachment': attachments[0].pk,
+            'upload': upload.pk,
+            'time_entry': TimeEntry.objects.filter(user=viewer, is_running=False).first().pk,
+            'running_entry': running.pk,
+            'notification': Notification.objects.filter(user=viewer).first().pk,
+            'start': (now - timedelta(days=30)).date().isoformat(),
+            'month': now.month,
+            'year': now.year,
+            'now': now.isoformat(),
+        }
+
+    def measure(self, method, path, payload, context):
+        # Start each request from the same process state: empty caches and
+        # full throttle buckets.
+        cache.clear()
+        TokenBucketThrottle.reset()
+        client = APIClient()
+        token = TaskFlowRefreshToken.for_user(context['viewer']).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        recorder = QueryRecorder()
+        with transaction.atomic():
+            with connection.execute_wrapper(recorder):
+                response = getattr(client, method)(_fill(path, context), _fill(payload, context), format='json')
+            transaction.set_rollback(True)
+        return response, recorder
+
+    def test_query_counts_do_not_grow_with_data(self):
+        for name, method, path, payload in CASES:
+            with self.subTest(name=name, request=f'{method.upper()} {path}'):
+                small_response, small = self.measure(method, path, payload, self.graphs['small'])
+                large_response, large = self.measure(method, path, payload, self.graphs['large'])
+                self.assertLess(small_response.status_code, 500)
+                self.assertEqual(small_response.status_code, large_response.status_code)
+                self.assertEqual(
+                    len(small.queries), len(large.queries),
+                    f'\n{method.upper()} {path} ran {len(small.queries)} queries on the small graph and '
+                    f'{len(large.queries)} on the large one:\n{describe(small, large)}'
+                )
+
+    def test_every_endpoint_is_covered(self):
+        covered = {name for name, *_ in CASES}
+        missing = set(_url_names(urls.urlpatterns)) - covered
+        self.assertFalse(missing, f'Add query-count cases for: {", ".join(sorted(missing))}')
+
+    def test_cases_exercise_both_graphs(self):
+        # The large graph must actually be larger from the viewer's side.
+        visible = Counter()
+        for size, context in self.graphs.items():
+            visible[size] = Task.objects.filter(project__members=context['viewer']).count()
+        self.assertGreater(visible['large'], visible['small'])
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def make_user(name, role='scrum_master'):
+    return User.objects.create_user(username=name, email=f'{name}@example.com', password='password', role=role)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'attachment-tests'}},
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+class AttachmentDedupTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.owner, self.outsider = make_user('owner'), make_user('outsider')
+        self.content = b'confidential' * 8
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+        self.owner_client = client_for(self.owner)
+        project = self.owner_client.post('/api/projects/', {'name': 'Private', 'key': 'PRIV'}).data['id']
+        task = self.owner_client.post('/api/tasks/', {'project': project, 'title': 'Has a file'}).data['id']
+        self.owner_task = self.owner_client.post('/api/tasks/', {'project': project, 'title': 'Another'}).data['id']
+        response = self.owner_client.post(
+            '/api/attachments/', {'task': task, 'file': SimpleUploadedFile('a.txt', self.content)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def start_upload(self, client, task):
+        return client.post('/api/attachments/uploads/', {
+            'task': task, 'filename': 'b.txt', 'size': len(self.content), 'sha256': self.sha256
+        }, format='json')
+
+    def test_known_hash_reuses_a_visible_file(self):
+        response = self.start_upload(self.owner_client, self.owner_task)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('attachment', response.data)
+
+    def test_known_hash_does_not_reach_files_of_other_projects(self):
+        client = client_for(self.outsider)
+        project = client.post('/api/projects/', {'name': 'Mine', 'key': 'MINE'}).data['id']
+        task = client.post('/api/tasks/', {'project': project, 'title': 'Probe'}).data['id']
+        response = self.start_upload(client, task)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('attachment', response.data)
+        self.assertFalse(Attachment.objects.filter(task_id=task).exists())
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'login-tests'}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class LoginTests(TestCase):
+    def setUp(self):
+        TokenBucketThrottle.reset()
+
+    def test_non_string_credentials_are_rejected(self):
+        for payload in ({'email': 5, 'password': 'x'}, {'email': ['a@example.com'], 'password': 'x'},
+                        {'email': 'a@example.com', 'password': {'x': 1}}, ['a@example.com']):
+            with self.subTest(payload=payload):
+                response = APIClient().post('/api/auth/login/', payload, format='json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_pruning_other_scopes_keeps_drained_login_buckets(self):
+        rates = {'login': '3/min', 'login_email': '100/min', 'register': '10/hour'}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}), \
+                mock.patch.object(TokenBucketThrottle, 'max_buckets', 3):
+            client = APIClient()
+            statuses = [
+                client.post('/api/auth/login/', {'email': f'{index}@example.com', 'password': 'x'}, format='json').status_code
+                for index in range(4)
+            ]
+        self.assertEqual(statuses, [401, 401, 401, 429])
+
+
+class CalendarTests(TestCase):
+    def test_bad_dates_are_rejected(self):
+        client = client_for(make_user('planner'))
+        for query in ('view=month&start=2025-02-30', 'view=week&start=soon', 'view=month&end=2025-13-01',
+                      'view=agenda&after=2025-02-30,1'):
+            with self.subTest(query=query):
+                self.assertEqual(client.get(f'/api/calendar/tasks/?{query}').status_code, 400)
+
+
+class StatusIntervalTests(TestCase):
+    def test_change_inside_the_lag_window_keeps_the_original_status(self):
+        client = client_for(make_user('mover'))
+        project = client.post('/api/projects/', {'name': 'Flow', 'key': 'FLOW'}).data['id']
+        task = client.post('/api/tasks/', {'project': project, 'title': 'Moves'}).data['id']
+        created_at = timezone.now() - timedelta(hours=2)
+        Task.objects.filter(pk=task).update(created_at=created_at)
+        self.assertEqual(client.patch(f'/api/tasks/{task}/', {'status': 'in_progress'}).status_code, 200)
+
+        process_status_changes()
+        self.assertFalse(TaskStatusInterval.objects.filter(task_id=task).exists())
+
+        changed_at = timezone.now() - timedelta(hours=1)
+        ActivityLog.objects.filter(task_id=task).update(timestamp=changed_at)
+        process_status_changes()
+        intervals = TaskStatusInterval.objects.filter(task_id=task).order_by('entered_at')
+        self.assertEqual(
+            [(interval.status, interval.entered_at, interval.exited_at) for interval in intervals],
+            [('todo', created_at, changed_at), ('in_progress', changed_at, None)]
+        )
+
+
+class StatusMedianTests(TestCase):
+    def test_durations_start_at_the_last_change_before_the_window(self):
+        starter, finisher = make_user('starter'), make_user('finisher')
+        client = client_for(starter)
+        project = client.post('/api/projects/', {'name': 'Medians', 'key': 'MED'}).data['id']
+        old, new = (client.post('/api/tasks/', {'project': project, 'title': title}).data['id'] for title in 'ab')
+        now = timezone.now()
+        Task.objects.filter(pk__in=[old, new]).update(created_at=now - timedelta(days=10))
+        for task, user, from_value, to_value, days_ago in [
+            (old, starter, 'todo', 'in_progress', 7), (old, finisher, 'in_progress', 'review', 1),
+            (new, finisher, 'todo', 'in_progress', 2),
+        ]:
+            log = ActivityLog.objects.create(
+                task_id=task, user=user, action_type='status_changed', from_value=from_value, to_value=to_value
+            )
+            ActivityLog.objects.filter(pk=log.pk).update(timestamp=now - timedelta(days=days_ago))
+
+        medians = median_status_seconds(now - timedelta(days=5))
+        self.assertEqual(list(medians.index), [finisher.pk])
+        self.assertEqual(medians.loc[finisher.pk, 'in_progress'], timedelta(days=6).total_seconds())
+        self.assertEqual(medians.loc[finisher.pk, 'todo'], timedelta(days=8).total_seconds())
+        # No task has a change before this window.
+        medians = median_status_seconds(now - timedelta(days=8))
+        self.assertEqual(medians.loc[starter.pk, 'todo'], timedelta(days=3).total_seconds())
+
+
+class ProjectCountTests(TestCase):
+    def test_counts_are_not_multiplied_by_other_relations(self):
+        owner = make_user('lead')
+        client = client_for(owner)
+        project = client.post('/api/projects/', {'name': 'Counted', 'key': 'CNT'}).data['id']
+        for name in ('first', 'second'):
+            ProjectMember.objects.create(project_id=project, user=make_user(name, role='employee'))
+        for title, status in [('a', 'done'), ('b', 'todo'), ('c', 'todo'), ('d', 'review')]:
+            Task.objects.create(project_id=project, title=title, status=status, reporter=owner)
+        members = ProjectMember.objects.filter(project_id=project).count()
+
+        listed = client.get('/api/projects/').data[0]
+        self.assertEqual((listed['members_count'], listed['tasks_count'], listed['progress']), (members, 3, 25))
+        active = client.get('/api/dashboard/stats/').data['active_projects'][0]
+        self.assertEqual((active['members_count'], active['progress']), (members, 25))
+
+
+class DirectoryTests(TestCase):
+    def setUp(self):
+        self.caller = make_user('caller')
+        self.colleague = User.objects.create_user(
+            username='colleague', email='ana.k@example.com', first_name='Ana', last_name='Kowalska', password='password'
+        )
+        self.stranger = User.objects.create_user(
+            username='stranger', email='ana.s@example.com', first_name='Ana', last_name='Stranger', password='password'
+        )
+        self.client = client_for(self.caller)
+        project = self.client.post('/api/projects/', {'name': 'Shared', 'key': 'SHR'}).data['id']
+        ProjectMember.objects.create(project_id=project, user=self.colleague)
+
+    def test_search_matches_each_column_by_prefix(self):
+        for search in ('ana ko', 'KOWAL', 'Ana.K@'):
+            with self.subTest(search=search):
+                results = self.client.get('/api/users/', {'search': search}).data['results']
+                self.assertEqual([user['id'] for user in results], [self.colleague.pk])
+
+    def test_search_uses_the_name_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Reads an SQLite query plan')
+        sql, params = search_users(User.objects.all(), ['ana']).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        for index in ('api_user_first_name_upper_idx', 'api_user_last_name_upper_idx', 'api_user_email_upper_idx'):
+            self.assertIn(f'USING INDEX {index}', plan)
+
+    def test_only_users_sharing_a_project_are_listed(self):
+        listed = {user['id'] for user in self.client.get('/api/users/').data['results']}
+        self.assertEqual(listed, {self.caller.pk, self.colleague.pk})
+        ids = ','.join(str(user.pk) for user in (self.colleague, self.stranger))
+        looked_up = [user['id'] for user in self.client.get('/api/users/', {'ids': ids}).data]
+        self.assertEqual(looked_up, [self.colleague.pk])
+
+
+@override_settings(SYNC_LAG_SECONDS=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('syncer')
+        self.client = client_for(self.owner)
+        self.project = self.client.post('/api/projects/', {'name': 'Synced', 'key': 'SYN'}).data['id']
+
+    def sync(self, client=None, since=None):
+        response = (client or self.client).get('/api/sync/', {} if since is None else {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def create_task(self, title):
+        return self.client.post('/api/tasks/', {'project': self.project, 'title': title}).data['id']
+
+    @override_settings(SYNC_LAG_SECONDS=60)
+    def test_token_advances_once_changes_leave_the_lag_window(self):
+        token = self.sync()['token']
+        task = self.create_task('Recent')
+        recent = self.sync(since=token)
+        self.assertEqual((recent['token'], recent['tasks']), (token, []))
+
+        ChangeJournal.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+        settled = self.sync(since=token)
+        self.assertGreater(int(settled['token']), int(token))
+        self.assertEqual([row['id'] for row in settled['tasks']], [task])
+        self.assertEqual(self.sync(since=settled['token'])['tasks'], [])
+
+    def test_deleted_tasks_come_back_as_tombstones(self):
+        task = self.create_task('Doomed')
+        token = self.sync()['token']
+        self.assertEqual(self.client.delete(f'/api/tasks/{task}/').status_code, 204)
+        changes = self.sync(since=token)
+        self.assertEqual(changes['tasks'], [])
+        self.assertEqual(changes['deleted']['tasks'], [task])
+
+    def test_pruned_tokens_are_gone(self):
+        token = self.sync()['token']
+        self.create_task('Pruned')
+        ChangeJournal.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertGreater(prune_journal(timedelta(days=1)), 0)
+        response = self.client.get('/api/sync/', {'since': token})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(self.client.get('/api/sync/', {'since': self.sync()['token']}).status_code, 200)
+
+    def test_joined_project_arrives_with_its_contents(self):
+        task = self.create_task('Already there')
+        newcomer = make_user('newcomer', role='employee')
+        newcomer_client = client_for(newcomer)
+        token = self.sync(newcomer_client)['token']
+        response = self.client.post(f'/api/projects/{self.project}/add_member/', {'email': newcomer.email})
+        self.assertEqual(response.status_code, 201)
+        changes = self.sync(newcomer_client, since=token)
+        self.assertEqual([row['id'] for row in changes['tasks']], [task])
+
+
+class TaskVersionTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('editor')
+        self.client = client_for(self.owner)
+        project = self.client.post('/api/projects/', {'name': 'Versioned', 'key': 'VER'}).data['id']
+        self.parent = Task.objects.create(project_id=project, title='Parent', reporter=self.owner)
+        self.task = Task.objects.create(
+            project_id=project, title='Child', reporter=self.owner, parent_task=self.parent, story_points=3
+        )
+        # Someone else saves first.
+        self.client.patch(f'/api/tasks/{self.task.pk}/', {'title': 'Renamed'}, format='json')
+        self.task.refresh_from_db()
+
+    def assert_conflict(self, response):
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['current']['version'], self.task.version)
+        self.assertEqual(response.data['current']['title'], 'Renamed')
+
+    def test_stale_if_match_is_rejected(self):
+        response = self.client.patch(
+            f'/api/tasks/{self.task.pk}/', {'title': 'Lost'}, format='json', HTTP_IF_MATCH=f'"{self.task.version - 1}"'
+        )
+        self.assert_conflict(response)
+
+    def test_stale_body_version_is_rejected(self):
+        response = self.client.patch(
+            f'/api/tasks/{self.task.pk}/', {'title': 'Lost', 'version': self.task.version - 1}, format='json'
+        )
+        self.assert_conflict(response)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'Renamed')
+
+    def test_stale_move_leaves_rollups_and_journal_alone(self):
+        journal, logs = ChangeJournal.objects.count(), ActivityLog.objects.count()
+        response = self.client.post(
+            f'/api/tasks/{self.task.pk}/move/', {'status': 'done', 'version': self.task.version - 1}, format='json'
+        )
+        self.assert_conflict(response)
+        self.parent.refresh_from_db()
+        self.assertEqual((self.parent.rollup_task_count, self.parent.rollup_done_count), (1, 0))
+        self.assertEqual((ChangeJournal.objects.count(), ActivityLog.objects.count()), (journal, logs))
+
+        response = self.client.post(
+            f'/api/tasks/{self.task.pk}/move/', {'status': 'done', 'version': self.task.version}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.parent.refresh_from_db()
+        self.assertEqual(self.parent.rollup_done_count, 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RegistrationTests(TestCase):
+    def setUp(self):
+        TokenBucketThrottle.reset()
+
+    def register(self, email, role='scrum_master'):
+        return APIClient().post('/api/auth/register/', {
+            'email': email, 'password': 'a long new password', 'role': role
+        }, format='json')
+
+    def test_invited_account_is_claimed_once_and_keeps_its_role(self):
+        lead = make_user('inviter')
+        project = client_for(lead).post('/api/projects/', {'name': 'Invites', 'key': 'INV'}).data['id']
+        response = client_for(lead).post(
+            f'/api/projects/{project}/add_members/', {'emails': ['guest@example.com']}, format='json'
+        )
+        self.assertEqual(response.data['results'][0]['status'], 'invited')
+
+        self.assertEqual(self.register('GUEST@example.com').status_code, 201)
+        guest = User.objects.get(email='guest@example.com')
+        self.assertEqual((guest.role, guest.invited_at), ('employee', None))
+        self.assertTrue(guest.check_password('a long new password'))
+        self.assertTrue(ProjectMember.objects.filter(project_id=project, user=guest).exists())
+        self.assertEqual(self.register('guest@example.com').status_code, 400)
+
+    def test_single_invite_matches_existing_accounts_case_insensitively(self):
+        lead = make_user('single')
+        first = User.objects.create_user(username='first', email='Dup@example.com', password='password')
+        User.objects.create_user(username='second', email='dup@example.com', password='password')
+        client = client_for(lead)
+        project = client.post('/api/projects/', {'name': 'Single', 'key': 'SGL'}).data['id']
+        response = client.post(f'/api/projects/{project}/add_member/', {'email': 'DUP@EXAMPLE.COM'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user']['id'], first.pk)
+        self.assertEqual(User.objects.by_email('dup@example.com').count(), 2)
+
+    def test_accounts_not_made_by_an_invite_cannot_be_claimed(self):
+        User.objects.create_superuser(username='root', email='root@example.com', password=None)
+        User.objects.create_user(username='sso', email='sso@example.com', password=None)
+        for email in ('ROOT@example.com', 'sso@example.com'):
+            with self.subTest(email=email):
+                self.assertEqual(self.register(email).status_code, 400)
+                user = User.objects.by_email(email).get()
+                self.assertFalse(user.has_usable_password())
+                self.assertEqual(user.role, 'employee')
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'blacklist-tests'}},
+)
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('holder')
+
+    def test_refresh_token_blacklisted_elsewhere_is_rejected(self):
+        refresh = TaskFlowRefreshToken.for_user(self.user)
+        client = APIClient()
+        self.assertEqual(client.post('/api/auth/refresh/', {'refresh': str(refresh)}).status_code, 200)
+        # A logout handled by another process only leaves the database row.
+        refresh = TaskFlowRefreshToken.for_user(self.user)
+        RefreshToken(str(refresh)).blacklist()
+        self.assertEqual(client.post('/api/auth/refresh/', {'refresh': str(refresh)}).status_code, 401)
+
+    def test_access_token_blacklisted_after_being_seen_is_rejected(self):
+        access = TaskFlowRefreshToken.for_user(self.user).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(client.get('/api/users/me/').status_code, 200)
+        blacklist_token(access, self.user)
+        self.assertEqual(client.get('/api/users/me/').status_code, 401)
+        cache.clear()
+        self.assertEqual(client.get('/api/users/me/').status_code, 401)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def test_one_request_reads_from_a_single_replica(self):
+        router = db_routers.ReplicaRouter()
+
+        @db_routers.reads_from_replica
+        def view(request):
+            return {router.db_for_read(Task) for _ in range(50)}
+
+        request = RequestFactory().get('/api/')
+        request.user = AnonymousUser()
+        with mock.patch.object(db_routers, 'replica_aliases', return_value=['replica_a', 'replica_b', 'replica_c']):
+            chosen = view(request)
+        self.assertEqual(len(chosen), 1)
+        self.assertIn(chosen.pop(), ['replica_a', 'replica_b', 'replica_c'])
+        self.assertIsNone(router.db_for_read(Task))
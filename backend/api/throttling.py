@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    # In-process token bucket: each client gets `num_requests` tokens that
+    # refill continuously over `duration`, so bursts are allowed but the
+    # average rate is capped. No cache round trips on the hot path. Rates
+    # come from DEFAULT_THROTTLE_RATES[scope].
+    scope = None
+    max_buckets = 10000
+
+    # Least recently used first, for eviction once the table is full.
+    _buckets = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.capacity, duration = SimpleRateThrottle.parse_rate(None, rate)
+        self.refill_per_second = self.capacity / duration if rate else 0
+        self.wait_seconds = None
+
+    def get_bucket_key(self, request, view):
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        if not self.capacity:
+            return True
+        key = self.get_bucket_key(request, view)
+        if key is None:
+            return True
+        key = (self.scope, key)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.wait_seconds = (1 - tokens) / self.refill_per_second
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+        return allowed
+
+    def _prune(self, now):
+        # Buckets that have refilled (at their own scope's rate) are dropped,
+        # since a new one would start full anyway. If that isn't enough, the
+        # least recently used go too, down to 90% so the scan doesn't rerun
+        # on every request while the table stays busy.
+        rates = {}
+        for key, (tokens, updated_at) in list(self._buckets.items()):
+            if key[0] not in rates:
+                rate = api_settings.DEFAULT_THROTTLE_RATES.get(key[0])
+                capacity, duration = SimpleRateThrottle.parse_rate(None, rate)
+                rates[key[0]] = (capacity or 0, capacity / duration if rate else 0)
+            capacity, refill_per_second = rates[key[0]]
+            if tokens + (now - updated_at) * refill_per_second >= capacity:
+                del self._buckets[key]
+        while len(self._buckets) > self.max_buckets * 9 // 10:
+            self._buckets.popitem(last=False)
+
+    def wait(self):
+        return self.wait_seconds
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._buckets.clear()
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+
+class LoginEmailRateThrottle(TokenBucketThrottle):
+    # Slows credential stuffing against one account from many addresses.
+    scope = 'login_email'
+
+    def get_bucket_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+class RegisterRateThrottle(TokenBucketThrottle):
+    scope = 'register'
@@ -0,0 +1,100 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import ActivityLog, Comment
+from .serializers import ActivityLogSerializer, CommentSerializer
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# (entry type, model, timestamp field, related user field, serializer)
+SOURCES = [
+    ('activity', ActivityLog, 'timestamp', 'user', ActivityLogSerializer),
+    ('comment', Comment, 'created_at', 'author', CommentSerializer),
+]
+
+
+def encode_cursor(timestamp, kind, pk):
+    raw = f'{timestamp.isoformat()}|{kind}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        timestamp, kind, pk = raw.split('|')
+        timestamp, pk = parse_datetime(timestamp), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        timestamp = None
+    if timestamp is None:
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+    return timestamp, kind, pk
+
+
+def _older_than(queryset, field, kind, cursor):
+    # Entries sort by (timestamp, type, id) descending; keep those after the
+    # cursor so each source can use its (task, timestamp, id) index.
+    timestamp, cursor_kind, cursor_id = cursor
+    condition = Q(**{f'{field}__lt': timestamp})
+    if kind < cursor_kind:
+        condition |= Q(**{field: timestamp})
+    elif kind == cursor_kind:
+        condition |= Q(**{field: timestamp, 'id__lt': cursor_id})
+    return queryset.filter(condition)
+
+
+def timeline_page(task_id, cursor=None, limit=DEFAULT_LIMIT, users=None):
+    # One page of comments and activity merged newest first. Each source is
+    # read with a single keyset query of at most limit + 1 rows.
+    entries = []
+    for kind, model, field, user_field, serializer_class in SOURCES:
+        queryset = model.objects.filter(task_id=task_id).select_related(user_field)
+        if cursor is not None:
+            queryset = _older_than(queryset, field, kind, cursor)
+        for obj in queryset.order_by(f'-{field}', '-id')[:limit + 1]:
+            entries.append((getattr(obj, field), kind, obj.id, obj, serializer_class))
+    entries.sort(key=lambda entry: entry[:3], reverse=True)
+
+    context = {'users': users} if users is not None else {}
+    results = []
+    for timestamp, kind, pk, obj, serializer_class in entries[:limit]:
+        data = serializer_class(obj, context=context).data
+        data['type'] = kind
+        results.append(data)
+
+    next_cursor = None
+    if len(entries) > limit:
+        timestamp, kind, pk = entries[limit - 1][:3]
+        next_cursor = encode_cursor(timestamp, kind, pk)
+    return {'results': results, 'next': next_cursor}
+
+
+def _latest_key(task_id, normalized):
+    return f"task-timeline:{task_id}{':users' if normalized else ''}"
+
+
+def latest_timeline_page(task_id, users=None):
+    # The first page is what the task modal opens with, so it is cached until
+    # the task gets a new comment or activity entry. Normalized responses
+    # cache the referenced user ids alongside the page.
+    key = _latest_key(task_id, users is not None)
+    cached = cache.get(key)
+    if cached is None:
+        page_users = set() if users is not None else None
+        page = timeline_page(task_id, users=page_users)
+        cached = (page, sorted(page_users or ()))
+        cache.set(key, cached, getattr(settings, 'TASK_TIMELINE_CACHE_SECONDS', 300))
+    page, user_ids = cached
+    if users is not None:
+        users.update(user_ids)
+    return page
+
+
+def invalidate_timeline(task_ids):
+    cache.delete_many([_latest_key(task_id, normalized) for task_id in task_ids for normalized in (False, True)])
@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt import serializers
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+def _blacklist_key(jti):
+    return f'jwt-blacklisted:{jti}'
+
+
+def is_blacklisted(jti):
+    # Access tokens are checked on every request, so the answer is kept in
+    # the shared cache per jti. A miss goes to the database; the result only
+    # fills an empty key, so it can't overwrite a blacklisting that landed
+    # meanwhile. Without a shared cache (no REDIS_URL), other processes can
+    # take up to JWT_BLACKLIST_CACHE_SECONDS to notice.
+    key = _blacklist_key(jti)
+    blacklisted = cache.get(key)
+    if blacklisted is None:
+        blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        cache.add(key, blacklisted, getattr(settings, 'JWT_BLACKLIST_CACHE_SECONDS', 30))
+    return blacklisted
+
+
+def blacklist_token(token, user=None):
+    jti = token[api_settings.JTI_CLAIM]
+    outstanding, _ = OutstandingToken.objects.get_or_create(
+        jti=jti,
+        defaults={
+            'user': user,
+            'token': str(token),
+            'expires_at': datetime_from_epoch(token['exp']),
+        },
+    )
+    BlacklistedToken.objects.get_or_create(token=outstanding)
+    cache.set(_blacklist_key(jti), True, max(1, int(token['exp'] - time.time())))
+
+
+class TaskFlowRefreshToken(RefreshToken):
+    # Carries the user's role so permission checks can read it off the token;
+    # access tokens derived from it copy the claim. Refreshing is rare, so
+    # the inherited blacklist check asks the database every time.
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        return token
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    token_class = TaskFlowRefreshToken
@@ -8,19 +8,26 @@ router.register(r'projects', views.ProjectViewSet, basename='project')
 router.register(r'sprints', views.SprintViewSet, basename='sprint')
 router.register(r'tasks', views.TaskViewSet, basename='task')
 router.register(r'comments', views.CommentViewSet, basename='comment')
+router.register(r'attachments', views.AttachmentViewSet, basename='attachment')
 router.register(r'time-entries', views.TimeEntryViewSet, basename='time-entry')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('health/', views.health_check, name='health_check'),
     path('auth/register/', views.register, name='register'),
     path('auth/login/', views.login, name='login'),
+    path('auth/logout/', views.logout, name='logout'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('users/me/', views.user_profile, name='user_profile'),
     path('users/', views.users_list, name='users_list'),
     path('analytics/events/', views.log_behavioral_event, name='log_event'),
     path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
     path('analytics/data/', views.analytics_data, name='analytics_data'),
+    path('analytics/profile/', views.productivity_profile, name='productivity_profile'),
+    path('analytics/cycle-time/', views.cycle_time, name='cycle_time'),
     path('calendar/tasks/', views.calendar_tasks, name='calendar_tasks'),
     path('team/stats/', views.team_stats, name='team_stats'),
+    path('sync/', views.sync, name='sync'),
+    path('batch/', views.batch, name='batch'),
 ]
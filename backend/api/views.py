@@ -1,27 +1,80 @@
-from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework import mixins, viewsets, status, permissions
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes, action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from django.conf import settings
 from django.contrib.auth import authenticate
-from django.db.models import Count, Avg, Sum, Q
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Count, Avg, Sum, Min, Q
+from django.db.models.functions import ExtractHour, TruncDate
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date
+from datetime import date, timedelta
 
 from .models import (
     User, Project, ProjectMember, Sprint, Task, Comment,
-    Attachment, ActivityLog, BehavioralEvent, TimeEntry, Notification
+    Attachment, AttachmentUpload, ActivityLog, BehavioralEvent, TimeEntry, Notification, UserProductivityProfile,
+    ProcessingCheckpoint, VersionConflict, tree_contribution
 )
 from .serializers import (
     UserSerializer, UserRegisterSerializer, ProjectSerializer, ProjectMemberSerializer,
     SprintSerializer, TaskListSerializer, TaskDetailSerializer, TaskCreateUpdateSerializer,
-    CommentSerializer, AttachmentSerializer, ActivityLogSerializer,
-    BehavioralEventSerializer, TimeEntrySerializer, NotificationSerializer
+    CommentSerializer, AttachmentSerializer, AttachmentUploadSerializer, ActivityLogSerializer,
+    BehavioralEventSerializer, TimeEntrySerializer, NotificationSerializer,
+    member_count, with_project_counts, with_sprint_counts, with_task_list_relations
 )
-from .permissions import CanManageProject, CanManageTask, CanManageSprint, IsScrumMaster
+from .permissions import CanManageProject, CanManageTask, CanManageSprint, IsScrumMaster, is_scrum_master
+from .attachments import (
+    UploadBusy, append_chunk, create_attachment, discard_upload, download_response, existing_blob, finish_upload,
+    locked_part, purge_stale_uploads, start_part, store_uploaded_file
+)
+from .batch import parse_spec, run_batch, shared_value
+from .db_routers import SAFE_METHODS, reads_from_replica
+from .metrics import registry
+from .journal import TokenExpired, changes_since, record_changes
+from .directory import (
+    DIRECTORY_ORDERING, UserDirectoryPagination, directory_users, parse_ids, project_member_users, search_terms,
+    search_users, user_matches
+)
+from .services import add_project_members, complete_sprint
+from .timeline import DEFAULT_LIMIT, MAX_LIMIT, decode_cursor, latest_timeline_page, timeline_page
+from .throttling import LoginRateThrottle, LoginEmailRateThrottle, RegisterRateThrottle
+from .tokens import TaskFlowRefreshToken, blacklist_token
+from .sparse import (
+    SparseFieldsMixin, TASK_FIELDS, PROJECT_FIELDS, COMMENT_FIELDS, normalize_requested, requested_names, with_users,
+    _decimal
+)
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def health_check(request):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return Response({'status': 'error', 'database': 'unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({'status': 'ok', 'database': 'ok'})
+
+def metrics(request):
+    # Prometheus text exposition of api.metrics.registry. Plain Django view so
+    # scraping doesn't go through DRF authentication or content negotiation.
+    if settings.METRICS_TOKEN:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ')
+        allowed = constant_time_compare(supplied, settings.METRICS_TOKEN)
+    else:
+        allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterRateThrottle])
 def register(request):
     # Make password optional for validation and set a default if missing
     data = request.data.copy()
@@ -32,9 +85,7 @@ def register(request):
     if serializer.is_valid():
         try:
             user = serializer.save()
-            user.is_active = True
-            user.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = TaskFlowRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'refresh': str(refresh),
@@ -46,27 +97,40 @@ def register(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle, LoginEmailRateThrottle])
 def login(request):
-    email = request.data.get('email')
-    password = request.data.get('password')
+    data = request.data if hasattr(request.data, 'get') else {}
+    email = data.get('email')
+    password = data.get('password')
     
-    if not email or not password:
+    if not email or not password or not isinstance(email, str) or not isinstance(password, str):
         return Response({'error': 'Email and password are required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        user = User.objects.get(email=email)
-        if user.check_password(password) and user.is_active:
-            refresh = RefreshToken.for_user(user)
-            return Response({
-                'user': UserSerializer(user).data,
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            })
-    except User.DoesNotExist:
-        pass
+    # check_password() also upgrades the stored hash if PASSWORD_HASHERS or
+    # PBKDF2_ITERATIONS changed since it was created.
+    user = User.objects.by_email(email).order_by('id').first()
+    if user is not None and user.check_password(password) and user.is_active:
+        refresh = TaskFlowRefreshToken.for_user(user)
+        return Response({
+            'user': UserSerializer(user).data,
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        })
     
     return Response({'error': 'Invalid email or password'}, status=status.HTTP_401_UNAUTHORIZED)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    refresh = request.data.get('refresh')
+    if refresh:
+        try:
+            TaskFlowRefreshToken(refresh).blacklist()
+        except TokenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    blacklist_token(request.auth, request.user)
+    return Response(status=status.HTTP_205_RESET_CONTENT)
+
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
@@ -82,17 +146,53 @@ def user_profile(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def users_list(request):
-    users = User.objects.all()
-    return Response(UserSerializer(users, many=True).data)
+    # ?ids=1,2,3 resolves specific users (e.g. assignees already on screen);
+    # otherwise a paginated directory, optionally limited to one project's
+    # members and filtered by name/email prefix with ?search=. Only users
+    # sharing a visible project with the caller are listed.
+    directory = directory_users(request.user, visible_projects(request.user))
+    if 'ids' in request.query_params:
+        ids = parse_ids(request.query_params['ids'])
+        users = directory.in_bulk(ids)
+        return Response(UserSerializer([users[i] for i in ids if i in users], many=True).data)
+    
+    terms = search_terms(request.query_params.get('search'))
+    paginator = UserDirectoryPagination()
+    project_id = request.query_params.get('project')
+    if project_id:
+        visible = Project.objects.filter(Q(created_by=request.user) | Q(members=request.user))
+        if not project_id.isdigit() or not visible.filter(id=project_id).exists():
+            return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+        users = [user for user in project_member_users(int(project_id)) if user_matches(user, terms)]
+        page = paginator.paginate_queryset(users, request)
+        return paginator.get_paginated_response(page)
+    
+    users = search_users(directory.order_by(*DIRECTORY_ORDERING), terms)
+    page = paginator.paginate_queryset(users, request)
+    return paginator.get_paginated_response(UserSerializer(page, many=True).data)
+
+MAX_BULK_MEMBERS = 1000
+
+def visible_projects(user):
+    # Membership as a subquery rather than a join, so no DISTINCT is needed and
+    # Count('members') annotations see every member, not just this user.
+    # Within a batch the ids are looked up once and shared by every sub-request.
+    queryset = Project.objects.filter(
+        Q(created_by=user) | Q(pk__in=ProjectMember.objects.filter(user=user).values('project_id'))
+    )
+    ids = shared_value(('visible_projects', user.pk), lambda: list(queryset.values_list('pk', flat=True)))
+    return queryset if ids is None else Project.objects.filter(pk__in=ids)
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
+    sparse_fields = PROJECT_FIELDS
     permission_classes = [IsAuthenticated, CanManageProject]
     
     def get_queryset(self):
-        return Project.objects.filter(
-            Q(created_by=self.request.user) | Q(members=self.request.user)
-        ).distinct()
+        queryset = visible_projects(self.request.user)
+        if self.action in ('list', 'retrieve') and requested_names(self.request, 'fields') is None:
+            queryset = with_project_counts(queryset)
+        return queryset
     
     def perform_create(self, serializer):
         project = serializer.save(created_by=self.request.user)
@@ -101,7 +201,11 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def members(self, request, pk=None):
         project = self.get_object()
-        members = ProjectMember.objects.filter(project=project)
+        members = ProjectMember.objects.filter(project=project).select_related('user')
+        if normalize_requested(request):
+            users = set()
+            data = ProjectMemberSerializer(members, many=True, context={'users': users}).data
+            return Response(with_users(data, users, request))
         return Response(ProjectMemberSerializer(members, many=True).data)
     
     @action(detail=True, methods=['post'])
@@ -110,20 +214,22 @@ class ProjectViewSet(viewsets.ModelViewSet):
         email = request.data.get('email')
         role = request.data.get('role', 'member')
         
-        if not email:
+        if not email or not isinstance(email, str):
             return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            # Try to find existing user by email
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        # Same case-insensitive match as add_members and registration; the
+        # oldest account wins if several differ only in case.
+        user = User.objects.by_email(email).order_by('id').first()
+        if user is None:
             # Create a new user if they don't exist yet
+            # No password yet; they set one by registering with this email
             try:
                 user = User.objects.create_user(
                     email=email,
                     username=email,
-                    password='TempPass123!',  # Temporary password, user should reset on first login
-                    role='employee'
+                    password=None,
+                    role='employee',
+                    invited_at=timezone.now()
                 )
             except Exception as e:
                 return Response({'error': f'Failed to create user: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
@@ -138,24 +244,60 @@ class ProjectViewSet(viewsets.ModelViewSet):
         )
         return Response(ProjectMemberSerializer(member).data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'])
+    def add_members(self, request, pk=None):
+        project = self.get_object()
+        emails = request.data.get('emails')
+        role = request.data.get('role', 'member')
+        
+        if isinstance(emails, str):
+            emails = emails.replace(',', ' ').split()
+        if not emails or not isinstance(emails, list):
+            return Response({'error': 'A list of emails is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(emails) > MAX_BULK_MEMBERS:
+            return Response({'error': f'At most {MAX_BULK_MEMBERS} emails per request'}, status=status.HTTP_400_BAD_REQUEST)
+        if role not in dict(ProjectMember.ROLE_CHOICES):
+            return Response({'error': 'Invalid role'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = add_project_members(project, emails, role)
+        return Response({'results': results})
+    
     @action(detail=True, methods=['get'])
     def board(self, request, pk=None):
         project = self.get_object()
-        tasks = project.tasks.all()
+        board = {column: [] for column in ['todo', 'in_progress', 'review', 'done']}
+        tasks = project.tasks.filter(status__in=list(board))
         
-        board = {
-            'todo': TaskListSerializer(tasks.filter(status='todo'), many=True).data,
-            'in_progress': TaskListSerializer(tasks.filter(status='in_progress'), many=True).data,
-            'review': TaskListSerializer(tasks.filter(status='review'), many=True).data,
-            'done': TaskListSerializer(tasks.filter(status='done'), many=True).data,
-        }
+        sparse = TASK_FIELDS.parse(request)
+        users = set() if normalize_requested(request) else None
+        if sparse is not None:
+            names, expand = sparse
+            rows = TASK_FIELDS.serialize(tasks, names + ['status'], expand, request, users)
+            for row in rows:
+                column = row['status'] if 'status' in names else row.pop('status')
+                board[column].append(row)
+        else:
+            context = {'users': users} if users is not None else {}
+            for row in TaskListSerializer(with_task_list_relations(tasks), many=True, context=context).data:
+                board[row['status']].append(row)
+        if users is not None:
+            return Response(with_users(board, users, request))
         return Response(board)
     
     @action(detail=True, methods=['get'])
     def backlog(self, request, pk=None):
         project = self.get_object()
         tasks = project.tasks.filter(status='backlog', sprint__isnull=True)
-        return Response(TaskListSerializer(tasks, many=True).data)
+        sparse = TASK_FIELDS.parse(request)
+        users = set() if normalize_requested(request) else None
+        if sparse is not None:
+            data = TASK_FIELDS.serialize(tasks, *sparse, request=request, users=users)
+        else:
+            context = {'users': users} if users is not None else {}
+            data = TaskListSerializer(with_task_list_relations(tasks), many=True, context=context).data
+        if users is not None:
+            return Response(with_users(data, users, request))
+        return Response(data)
 
 class SprintViewSet(viewsets.ModelViewSet):
     serializer_class = SprintSerializer
@@ -164,33 +306,79 @@ class SprintViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         project_id = self.request.query_params.get('project')
         if project_id:
-            return Sprint.objects.filter(project_id=project_id)
-        return Sprint.objects.filter(project__members=self.request.user)
+            queryset = Sprint.objects.filter(project_id=project_id)
+        else:
+            queryset = Sprint.objects.filter(project__members=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            queryset = with_sprint_counts(queryset)
+        return queryset
     
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
         sprint = self.get_object()
-        Sprint.objects.filter(project=sprint.project, is_active=True).update(is_active=False)
-        sprint.is_active = True
-        sprint.start_date = timezone.now().date()
-        sprint.save()
+        with transaction.atomic():
+            active = list(Sprint.objects.filter(
+                project=sprint.project_id, is_active=True
+            ).exclude(pk=sprint.pk).values_list('id', flat=True))
+            Sprint.objects.filter(pk__in=active).update(is_active=False)
+            record_changes('sprint', active, project_id=sprint.project_id)
+            sprint.is_active = True
+            sprint.start_date = timezone.now().date()
+            sprint.save()
         return Response(SprintSerializer(sprint).data)
     
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         sprint = self.get_object()
-        sprint.is_active = False
-        sprint.is_completed = True
-        sprint.end_date = timezone.now().date()
-        sprint.save()
+        carry_over_to = None
+        target_id = request.data.get('carry_over_to')
+        if target_id:
+            try:
+                carry_over_to = Sprint.objects.exclude(pk=sprint.pk).get(
+                    pk=target_id, project_id=sprint.project_id, is_completed=False
+                )
+            except (Sprint.DoesNotExist, ValueError, TypeError):
+                return Response({'error': 'Invalid sprint to carry tasks over to'}, status=status.HTTP_400_BAD_REQUEST)
         
-        incomplete_tasks = sprint.tasks.exclude(status='done')
-        incomplete_tasks.update(sprint=None, status='backlog')
+        carried_over = complete_sprint(sprint, request.user, carry_over_to)
         
-        return Response(SprintSerializer(sprint).data)
+        data = SprintSerializer(sprint).data
+        data['carried_over'] = carried_over
+        return Response(data)
+
+TREE_FIELDS = (
+    'id', 'parent_task_id', 'title', 'task_type', 'status', 'priority', 'assignee_id', 'story_points',
+    'estimated_hours', 'rollup_story_points', 'rollup_estimated_hours', 'rollup_task_count', 'rollup_done_count'
+)
+
+def expected_version(request):
+    # The version a client last saw, from If-Match (the ETag of a task
+    # response) or a version field in the body. None means the save is only
+    # checked against the version read for this request.
+    header = request.headers.get('If-Match', '').strip()
+    if header and header != '*':
+        value = header.removeprefix('W/').strip('"')
+    elif isinstance(request.data, dict):
+        value = request.data.get('version')
+    else:
+        value = None
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({'version': 'Invalid version.'})
 
-class TaskViewSet(viewsets.ModelViewSet):
+def version_conflict(pk):
+    current = with_task_list_relations(Task.objects.filter(pk=pk)).first()
+    return Response({
+        'error': 'Task was changed by someone else',
+        'current': TaskListSerializer(current).data if current else None,
+    }, status=status.HTTP_409_CONFLICT)
+
+class TaskViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, CanManageTask]
+    sparse_fields = TASK_FIELDS
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -200,9 +388,14 @@ class TaskViewSet(viewsets.ModelViewSet):
         return TaskListSerializer
     
     def get_queryset(self):
-        queryset = Task.objects.filter(
-            Q(project__created_by=self.request.user) | Q(project__members=self.request.user)
-        ).distinct()
+        queryset = Task.objects.filter(project__in=visible_projects(self.request.user))
+        if self.action == 'list' and requested_names(self.request, 'fields') is None:
+            queryset = with_task_list_relations(queryset)
+        elif self.action == 'retrieve':
+            queryset = queryset.select_related('project', 'sprint', 'reporter', 'assignee')
+        elif self.action in ('update', 'partial_update'):
+            # perform_update compares against the old assignee.
+            queryset = queryset.select_related('assignee')
         
         project_id = self.request.query_params.get('project')
         if project_id:
@@ -234,10 +427,29 @@ class TaskViewSet(viewsets.ModelViewSet):
             event_type='task_created'
         )
     
+    def update(self, request, *args, **kwargs):
+        try:
+            response = super().update(request, *args, **kwargs)
+        except VersionConflict:
+            return version_conflict(kwargs['pk'])
+        if 'version' in response.data:
+            response['ETag'] = f'"{response.data["version"]}"'
+        return response
+    
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if 'version' in response.data:
+            response['ETag'] = f'"{response.data["version"]}"'
+        return response
+    
     def perform_update(self, serializer):
-        old_task = self.get_object()
-        old_status = old_task.status
-        old_assignee = old_task.assignee
+        # serializer.instance is still unchanged here, so it has the old state.
+        task = serializer.instance
+        old_status = task.status
+        old_assignee = task.assignee
+        expected = expected_version(self.request)
+        if expected is not None:
+            task.version = expected
         
         task = serializer.save()
         
@@ -279,11 +491,17 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         new_status = request.data.get('status')
         new_order = request.data.get('order', 0)
+        expected = expected_version(request)
         
         old_status = task.status
         task.status = new_status
         task.order = new_order
-        task.save()
+        if expected is not None:
+            task.version = expected
+        try:
+            task.save()
+        except VersionConflict:
+            return version_conflict(task.pk)
         
         ActivityLog.objects.create(
             task=task,
@@ -309,17 +527,70 @@ class TaskViewSet(viewsets.ModelViewSet):
                 event_type='task_completed'
             )
         
-        return Response(TaskListSerializer(task).data)
+        response = Response(TaskListSerializer(task).data)
+        response['ETag'] = f'"{task.version}"'
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        # The task and its whole subtree in one query over the path index.
+        task = self.get_object()
+        rows = Task.objects.filter(
+            Q(pk=task.pk) | Q(path__startswith=f'{task.path}{task.pk}/')
+        ).order_by('path', 'order', 'id').values(*TREE_FIELDS)
+        
+        nodes = {}
+        for row in rows:
+            own = tree_contribution(row['story_points'], row['estimated_hours'], row['status'])
+            tasks, done = row.pop('rollup_task_count'), row.pop('rollup_done_count')
+            row['estimated_hours'] = _decimal(row['estimated_hours'])
+            row['rollup'] = {
+                'story_points': own[0] + row.pop('rollup_story_points'),
+                'estimated_hours': _decimal(own[1] + row.pop('rollup_estimated_hours')),
+                'subtasks': tasks,
+                'subtasks_done': done,
+                'completion': round(done * 100 / tasks) if tasks else (100 if row['status'] == 'done' else 0),
+            }
+            row['assignee'] = row.pop('assignee_id')
+            row['children'] = []
+            nodes[row['id']] = row
+            parent = nodes.get(row.pop('parent_task_id'))
+            if parent is not None and row['id'] != task.pk:
+                parent['children'].append(row)
+        return Response(nodes[task.pk])
+    
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        task = self.get_object()
+        cursor = request.query_params.get('cursor')
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        if limit < 1:
+            limit = DEFAULT_LIMIT
+        
+        users = set() if normalize_requested(request) else None
+        if cursor is None and limit == DEFAULT_LIMIT:
+            page = latest_timeline_page(task.id, users)
+        else:
+            page = timeline_page(task.id, decode_cursor(cursor) if cursor else None, limit, users)
+        if users is not None:
+            return Response(with_users(page, users, request))
+        return Response(page)
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    sparse_fields = COMMENT_FIELDS
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         task_id = self.request.query_params.get('task')
         if task_id:
-            return Comment.objects.filter(task_id=task_id)
-        return Comment.objects.filter(task__project__members=self.request.user)
+            queryset = Comment.objects.filter(task_id=task_id)
+        else:
+            queryset = Comment.objects.filter(task__project__members=self.request.user)
+        return queryset.select_related('author')
     
     def perform_create(self, serializer):
         comment = serializer.save(author=self.request.user)
@@ -335,12 +606,127 @@ class CommentViewSet(viewsets.ModelViewSet):
             event_type='comment_added'
         )
 
+class AttachmentViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                        viewsets.GenericViewSet):
+    # Small files can be posted as multipart to /attachments/. Large ones
+    # use a resumable upload: POST /attachments/uploads/ with the size, then
+    # PATCH the bytes in order to /attachments/uploads/<id>/ with an
+    # Upload-Offset header; GET/HEAD there reports the offset to resume from.
+    serializer_class = AttachmentSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def _visible_tasks(self):
+        user = self.request.user
+        return Task.objects.filter(project__in=Project.objects.filter(Q(created_by=user) | Q(members=user)))
+    
+    def get_queryset(self):
+        queryset = Attachment.objects.filter(task__in=self._visible_tasks()).select_related('uploaded_by')
+        task_id = self.request.query_params.get('task')
+        if task_id:
+            queryset = queryset.filter(task_id=task_id)
+        return queryset.order_by('-uploaded_at')
+    
+    def create(self, request):
+        uploaded = request.FILES.get('file')
+        task_id = str(request.data.get('task', ''))
+        task = self._visible_tasks().filter(pk=task_id).first() if task_id.isdigit() else None
+        if uploaded is None or task is None:
+            return Response({'error': 'A file and a visible task are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if uploaded.size > getattr(settings, 'ATTACHMENT_MAX_SIZE', 2 * 1024 ** 3):
+            return Response({'error': 'File is too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        attachment = store_uploaded_file(task, request.user, uploaded)
+        return Response(self.get_serializer(attachment).data, status=status.HTTP_201_CREATED)
+    
+    def perform_destroy(self, instance):
+        if instance.uploaded_by_id != self.request.user.id and not is_scrum_master(self.request):
+            raise PermissionDenied('Only the uploader can delete this attachment.')
+        name = instance.file.name
+        instance.delete()
+        # Other attachments may share the same content-addressed file.
+        if not Attachment.objects.filter(file=name).exists():
+            instance.file.storage.delete(name)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        return download_response(request, self.get_object())
+    
+    @action(detail=False, methods=['post'], url_path='uploads')
+    def start_upload(self, request):
+        serializer = AttachmentUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        task = serializer.validated_data['task']
+        if not self._visible_tasks().filter(pk=task.pk).exists():
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+        purge_stale_uploads(request.user)
+        
+        # Clients that already know the content hash can skip sending bytes
+        # of a file they can already see; anything else is deduplicated only
+        # after the bytes arrive.
+        sha256 = str(request.data.get('sha256', '')).lower()
+        size = serializer.validated_data['size']
+        visible = Attachment.objects.filter(task__in=self._visible_tasks())
+        name = existing_blob(sha256, size, visible) if len(sha256) == 64 else None
+        if name is not None:
+            attachment = create_attachment(
+                task, request.user, serializer.validated_data['filename'],
+                serializer.validated_data.get('content_type', ''), name, sha256, size
+            )
+            return Response({'attachment': self.get_serializer(attachment).data}, status=status.HTTP_201_CREATED)
+        
+        upload = serializer.save(uploaded_by=request.user)
+        start_part(upload)
+        if upload.size == 0:
+            attachment = finish_upload(upload)
+            return Response({'attachment': self.get_serializer(attachment).data}, status=status.HTTP_201_CREATED)
+        response = Response(AttachmentUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+        response['Upload-Offset'] = '0'
+        return response
+    
+    @action(detail=False, methods=['get', 'patch', 'delete'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})')
+    def upload(self, request, upload_id=None):
+        upload = AttachmentUpload.objects.filter(pk=upload_id, uploaded_by=request.user).select_related('task').first()
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        if request.method == 'DELETE':
+            discard_upload(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'GET':
+            response = Response(AttachmentUploadSerializer(upload).data)
+            response['Upload-Offset'] = str(upload.received)
+            return response
+        
+        offset = request.headers.get('Upload-Offset')
+        if offset != str(upload.received):
+            response = Response(
+                {'error': 'Upload-Offset does not match the bytes received so far', 'offset': upload.received},
+                status=status.HTTP_409_CONFLICT
+            )
+            response['Upload-Offset'] = str(upload.received)
+            return response
+        try:
+            with locked_part(upload) as part:
+                received = append_chunk(part, upload, request.stream)
+                AttachmentUpload.objects.filter(pk=upload.pk).update(received=received, updated_at=timezone.now())
+                upload.received = received
+        except UploadBusy:
+            return Response({'error': 'Another chunk is being written'}, status=status.HTTP_409_CONFLICT)
+        except FileNotFoundError:
+            discard_upload(upload)
+            return Response({'error': 'Upload expired, start again'}, status=status.HTTP_410_GONE)
+        
+        if upload.received < upload.size:
+            response = Response(AttachmentUploadSerializer(upload).data)
+            response['Upload-Offset'] = str(upload.received)
+            return response
+        attachment = finish_upload(upload)
+        return Response({'attachment': self.get_serializer(attachment).data}, status=status.HTTP_201_CREATED)
+
 class TimeEntryViewSet(viewsets.ModelViewSet):
     serializer_class = TimeEntrySerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return TimeEntry.objects.filter(user=self.request.user)
+        return TimeEntry.objects.filter(user=self.request.user).select_related('task')
     
     def perform_create(self, serializer):
         TimeEntry.objects.filter(user=self.request.user, is_running=True).update(
@@ -377,7 +763,10 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        self.get_queryset().update(is_read=True)
+        with transaction.atomic():
+            unread = list(self.get_queryset().filter(is_read=False).values_list('id', flat=True))
+            Notification.objects.filter(pk__in=unread).update(is_read=True)
+            record_changes('notification', unread, recipient_id=request.user.pk)
         return Response({'status': 'ok'})
 
 @api_view(['POST'])
@@ -389,8 +778,21 @@ def log_behavioral_event(request):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def _clock(hour):
+    hour %= 24
+    return hour % 12 or 12, 'AM' if hour < 12 else 'PM'
+
+def format_hour_range(hour, span=2):
+    # 9 -> "9-11 AM", 11 -> "11 AM-1 PM", 22 -> "10 PM-12 AM"
+    start, start_period = _clock(hour)
+    end, end_period = _clock(hour + span)
+    if start_period == end_period:
+        return f"{start}-{end} {end_period}"
+    return f"{start} {start_period}-{end} {end_period}"
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@reads_from_replica
 def dashboard_stats(request):
     user = request.user
     now = timezone.now()
@@ -400,45 +802,53 @@ def dashboard_stats(request):
         Q(assignee=user) | Q(reporter=user)
     ).distinct()
     
-    completed_tasks = user_tasks.filter(status='done', completed_at__gte=week_ago).count()
-    in_progress_tasks = user_tasks.filter(status='in_progress').count()
-    overdue_tasks = user_tasks.filter(due_date__lt=now.date()).exclude(status='done').count()
+    counts = user_tasks.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='done', completed_at__gte=week_ago)),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        overdue=Count('id', filter=Q(due_date__lt=now.date()) & ~Q(status='done')),
+    )
+    completed_tasks = counts['completed']
+    in_progress_tasks = counts['in_progress']
+    overdue_tasks = counts['overdue']
     
-    time_entries = TimeEntry.objects.filter(user=user, start_time__gte=week_ago)
-    total_hours = sum(e.duration_seconds for e in time_entries) / 3600
+    tracked = TimeEntry.objects.filter(user=user, start_time__gte=week_ago).aggregate(seconds=Sum('duration_seconds'))
+    total_hours = (tracked['seconds'] or 0) / 3600
     
-    recent_tasks = user_tasks.order_by('-updated_at')[:10]
+    recent_tasks = with_task_list_relations(user_tasks.order_by('-updated_at'))[:10]
     
-    projects = Project.objects.filter(
-        Q(created_by=user) | Q(members=user)
-    ).distinct()[:5]
+    projects = visible_projects(user).annotate(
+        members_count=member_count(),
+        total=Count('tasks'),
+        done=Count('tasks', filter=Q(tasks__status='done')),
+        next_due=Min('tasks__due_date'),
+    )[:5]
     
     project_stats = []
     for project in projects:
-        total = project.tasks.count()
-        done = project.tasks.filter(status='done').count()
-        progress = int((done / total * 100)) if total > 0 else 0
+        progress = int((project.done / project.total * 100)) if project.total > 0 else 0
         project_stats.append({
             'id': project.id,
             'name': project.name,
-            'members_count': project.members.count(),
+            'members_count': project.members_count,
             'progress': progress,
-            'due_date': project.tasks.filter(due_date__isnull=False).order_by('due_date').first().due_date if project.tasks.filter(due_date__isnull=False).exists() else None
+            'due_date': project.next_due,
         })
     
-    productivity_events = BehavioralEvent.objects.filter(
-        user=user,
-        event_type='task_completed',
-        timestamp__gte=week_ago
-    )
-    
     best_hours = "9-11 AM"
-    if productivity_events.exists():
-        hours = [e.timestamp.hour for e in productivity_events]
-        if hours:
-            from collections import Counter
-            most_common_hour = Counter(hours).most_common(1)[0][0]
-            best_hours = f"{most_common_hour}-{most_common_hour + 2} AM" if most_common_hour < 12 else f"{most_common_hour - 12}-{most_common_hour - 10} PM"
+    profile = UserProductivityProfile.objects.filter(user=user).only('best_hour').first()
+    if profile is not None:
+        if profile.best_hour is not None:
+            best_hours = format_hour_range(profile.best_hour)
+    else:
+        # No profile built yet: fall back to this week's completions.
+        busiest = BehavioralEvent.objects.filter(
+            user=user,
+            event_type='task_completed',
+            timestamp__gte=week_ago
+        ).annotate(hour=ExtractHour('timestamp')).values('hour').annotate(n=Count('id')).order_by('-n', 'hour').first()
+        if busiest:
+            best_hours = format_hour_range(busiest['hour'])
     
     return Response({
         'tasks_completed': completed_tasks,
@@ -448,108 +858,267 @@ def dashboard_stats(request):
         'in_progress_tasks': in_progress_tasks,
         'best_work_hours': best_hours,
         'team_velocity': 24,
-        'completion_rate': 0 if not user_tasks.count() else int(completed_tasks / max(1, user_tasks.count()) * 100),
+        'completion_rate': int(completed_tasks / max(1, counts['total']) * 100),
         'recent_tasks': TaskListSerializer(recent_tasks, many=True).data,
         'active_projects': project_stats,
     })
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@reads_from_replica
+def productivity_profile(request):
+    user_id = request.query_params.get('user', request.user.id)
+    if str(user_id) != str(request.user.id) and not is_scrum_master(request):
+        return Response({'error': 'Only scrum masters can view other profiles'}, status=status.HTTP_403_FORBIDDEN)
+    profile = UserProductivityProfile.objects.filter(user_id=user_id).first() if str(user_id).isdigit() else None
+    if profile is None:
+        return Response({'error': 'No profile has been built for this user yet'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'user': profile.user_id,
+        'window_days': profile.window_days,
+        'events_analyzed': profile.events_analyzed,
+        'hour_of_week': [profile.hour_of_week[day * 24:(day + 1) * 24] for day in range(7)],
+        'best_work_hours': format_hour_range(profile.best_hour) if profile.best_hour is not None else None,
+        'median_status_seconds': profile.median_status_seconds,
+        'focus_sessions': profile.focus_sessions,
+        'computed_at': profile.computed_at,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@reads_from_replica
+def cycle_time(request):
+    # pandas is only loaded by workers that serve flow analytics.
+    from .flow import CHECKPOINT, cumulative_flow, cycle_time_summary
+    
+    project_id = request.query_params.get('project')
+    visible = Project.objects.filter(Q(created_by=request.user) | Q(members=request.user))
+    if not project_id or not project_id.isdigit() or not visible.filter(id=project_id).exists():
+        return Response({'error': 'A visible project is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        days = min(max(int(request.query_params.get('days', 90)), 1), 3650)
+    except ValueError:
+        days = 90
+    
+    now = timezone.now()
+    since = now - timedelta(days=days)
+    checkpoint = ProcessingCheckpoint.objects.filter(name=CHECKPOINT).first()
+    data = cycle_time_summary(int(project_id), since)
+    data.update({
+        'project': int(project_id),
+        'days': days,
+        'cumulative_flow': cumulative_flow(int(project_id), since, now),
+        'processed_at': checkpoint.updated_at if checkpoint else None,
+    })
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@reads_from_replica
 def analytics_data(request):
     user = request.user
     days = int(request.query_params.get('days', 7))
     now = timezone.now()
     start_date = now - timedelta(days=days)
     
-    tasks = Task.objects.filter(
-        Q(project__created_by=user) | Q(project__members=user),
-        created_at__gte=start_date
-    ).distinct()
+    projects = visible_projects(user)
+    tasks = Task.objects.filter(project__in=projects, created_at__gte=start_date)
     
     completed_tasks = tasks.filter(status='done').count()
     total_tasks = tasks.count()
     
-    status_distribution = tasks.values('status').annotate(count=Count('id'))
+    status_distribution = tasks.order_by().values('status').annotate(count=Count('id'))
     
-    priority_distribution = tasks.values('priority').annotate(count=Count('id'))
+    priority_distribution = tasks.order_by().values('priority').annotate(count=Count('id'))
     
+    completed_per_day = dict(
+        tasks.filter(status='done', completed_at__isnull=False).annotate(day=TruncDate('completed_at'))
+        .order_by().values('day').annotate(count=Count('id')).values_list('day', 'count')
+    )
     daily_completed = []
     for i in range(days):
         day = start_date + timedelta(days=i)
-        count = tasks.filter(
-            status='done',
-            completed_at__date=day.date()
-        ).count()
         daily_completed.append({
             'date': day.strftime('%Y-%m-%d'),
-            'count': count
+            'count': completed_per_day.get(day.date(), 0)
         })
     
-    team_members = User.objects.filter(
+    team_members = list(User.objects.filter(
         Q(projects__created_by=user) | Q(projects__in=Project.objects.filter(members=user))
-    ).distinct()[:10]
+    ).distinct()[:10])
+    member_counts = {
+        row['assignee']: row for row in Task.objects.filter(
+            assignee__in=team_members, created_at__gte=start_date
+        ).order_by().values('assignee').annotate(
+            assigned=Count('id'),
+            completed=Count('id', filter=Q(status='done')),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+        )
+    }
     
     team_performance = []
     for member in team_members:
-        member_tasks = Task.objects.filter(assignee=member, created_at__gte=start_date)
+        member_tasks = member_counts.get(member.id, {})
         team_performance.append({
             'id': member.id,
             'name': f"{member.first_name} {member.last_name}" if member.first_name else member.email,
-            'tasks_assigned': member_tasks.count(),
-            'tasks_completed': member_tasks.filter(status='done').count(),
-            'in_progress': member_tasks.filter(status='in_progress').count(),
+            'tasks_assigned': member_tasks.get('assigned', 0),
+            'tasks_completed': member_tasks.get('completed', 0),
+            'in_progress': member_tasks.get('in_progress', 0),
         })
     
     return Response({
         'tasks_completed': completed_tasks,
         'completion_rate': int(completed_tasks / max(1, total_tasks) * 100),
         'team_productivity': 0,
-        'active_projects': Project.objects.filter(
-            Q(created_by=user) | Q(members=user)
-        ).distinct().count(),
+        'active_projects': projects.count(),
         'status_distribution': list(status_distribution),
         'priority_distribution': list(priority_distribution),
         'daily_completed': daily_completed,
         'team_performance': team_performance,
     })
 
+CALENDAR_FIELDS = ('id', 'title', 'status', 'priority', 'task_type', 'assignee_id', 'project__key')
+CALENDAR_MAX_DAYS = 366
+AGENDA_LIMIT = 50
+
+def _month_bounds(day):
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first, next_month - timedelta(days=1)
+
+def _calendar_rows(tasks):
+    for row in tasks.values('due_date', *CALENDAR_FIELDS):
+        row['project_key'] = row.pop('project__key')
+        row['assignee'] = row.pop('assignee_id')
+        yield row.pop('due_date'), row
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@reads_from_replica
 def calendar_tasks(request):
+    # Due dates are always filtered as a plain range so the (project,
+    # due_date) index applies. ?month=&year= keeps the original full-task
+    # list; ?start=&end=&view=month|week|agenda returns compact tasks
+    # bucketed by day.
     user = request.user
-    month = request.query_params.get('month')
-    year = request.query_params.get('year')
-    
+    params = request.query_params
     tasks = Task.objects.filter(
-        Q(project__created_by=user) | Q(project__members=user),
+        project__in=Project.objects.filter(Q(created_by=user) | Q(members=user)),
         due_date__isnull=False
-    ).distinct()
+    )
     
-    if month and year:
-        tasks = tasks.filter(due_date__month=month, due_date__year=year)
+    if 'start' not in params and 'view' not in params:
+        month = params.get('month')
+        year = params.get('year')
+        if month and year:
+            try:
+                start, end = _month_bounds(date(int(year), int(month), 1))
+            except ValueError:
+                return Response({'error': 'Invalid month or year'}, status=status.HTTP_400_BAD_REQUEST)
+            tasks = tasks.filter(due_date__gte=start, due_date__lte=end)
+        return Response(TaskListSerializer(with_task_list_relations(tasks), many=True).data)
+    
+    view = params.get('view', 'month')
+    try:
+        # parse_date returns None for malformed input but raises for
+        # well-formed impossible dates like 2025-02-30.
+        start = parse_date(params['start']) if params.get('start') else timezone.localdate()
+        end = parse_date(params['end']) if params.get('end') else None
+    except ValueError:
+        start = end = None
+    if start is None or (params.get('end') and end is None):
+        return Response({'error': 'Dates must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    if view not in ('month', 'week', 'agenda'):
+        return Response({'error': 'view must be month, week or agenda'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if view == 'agenda':
+        # Upcoming tasks from start, paged with ?after=<date>,<id>.
+        tasks = tasks.filter(due_date__gte=start)
+        if end is not None:
+            tasks = tasks.filter(due_date__lte=end)
+        after = params.get('after')
+        if after:
+            after_date, _, after_id = after.partition(',')
+            try:
+                after_date = parse_date(after_date)
+            except ValueError:
+                after_date = None
+            if after_date is None or not after_id.isdigit():
+                return Response({'error': 'Invalid after cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            tasks = tasks.filter(Q(due_date__gt=after_date) | Q(due_date=after_date, id__gt=after_id))
+        try:
+            limit = max(1, min(int(params.get('limit', AGENDA_LIMIT)), 200))
+        except ValueError:
+            limit = AGENDA_LIMIT
+        rows = list(_calendar_rows(tasks.order_by('due_date', 'id')[:limit + 1]))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f'{rows[-1][0].isoformat()},{rows[-1][1]["id"]}'
+        end = rows[-1][0] if rows else end
+    else:
+        if end is None:
+            if view == 'week':
+                end = start + timedelta(days=6)
+            else:
+                start, end = _month_bounds(start)
+        if end < start or (end - start).days >= CALENDAR_MAX_DAYS:
+            return Response(
+                {'error': f'end must be on or after start and within {CALENDAR_MAX_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        tasks = tasks.filter(due_date__gte=start, due_date__lte=end)
+        rows = list(_calendar_rows(tasks.order_by('due_date', 'order', 'id')))
+        next_cursor = None
     
-    return Response(TaskListSerializer(tasks, many=True).data)
+    days = {}
+    for due_date, task in rows:
+        days.setdefault(due_date.isoformat(), []).append(task)
+    data = {
+        'view': view,
+        'start': start.isoformat(),
+        'end': end.isoformat() if end else None,
+        'days': days,
+    }
+    if view == 'agenda':
+        data['next'] = next_cursor
+    return Response(data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@reads_from_replica
 def team_stats(request):
     user = request.user
     
-    team_members = User.objects.filter(
+    team_members = list(User.objects.filter(
         Q(projects__created_by=user) | Q(projects__in=Project.objects.filter(members=user))
-    ).distinct()
+    ).distinct())
     
     now = timezone.now()
     month_ago = now - timedelta(days=30)
     
+    tracked = dict(
+        TimeEntry.objects.filter(user__in=team_members, start_time__gte=month_ago)
+        .order_by().values('user').annotate(seconds=Sum('duration_seconds')).values_list('user', 'seconds')
+    )
+    assigned = {
+        row['assignee']: row for row in Task.objects.filter(assignee__in=team_members).order_by().values(
+            'assignee'
+        ).annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='done', completed_at__gte=month_ago)),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+        )
+    }
+    
     members_data = []
     for member in team_members:
-        member_tasks = Task.objects.filter(assignee=member)
-        time_entries = TimeEntry.objects.filter(user=member, start_time__gte=month_ago)
-        total_hours = sum(e.duration_seconds for e in time_entries) / 3600
+        member_tasks = assigned.get(member.id, {})
+        total_hours = (tracked.get(member.id) or 0) / 3600
         
-        tasks_completed = member_tasks.filter(status='done', completed_at__gte=month_ago).count()
-        total_assigned = member_tasks.count()
+        tasks_completed = member_tasks.get('completed', 0)
+        total_assigned = member_tasks.get('total', 0)
         
         members_data.append({
             'id': member.id,
@@ -559,7 +1128,7 @@ def team_stats(request):
             'tasks_completed': tasks_completed,
             'hours_this_month': f"{total_hours:.0f}h",
             'efficiency': min(100, int((tasks_completed / max(1, total_assigned)) * 100)),
-            'is_active': member_tasks.filter(status='in_progress').exists(),
+            'is_active': member_tasks.get('in_progress', 0) > 0,
         })
     
     total_members = len(members_data)
@@ -577,3 +1146,44 @@ def team_stats(request):
         'total_hours': f"{total_hours:.0f}",
         'members': members_data,
     })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    since = request.query_params.get('since')
+    if since is not None:
+        if not since.isdigit():
+            return Response({'error': 'Invalid change token'}, status=status.HTTP_400_BAD_REQUEST)
+        since = int(since)
+    
+    users = set() if normalize_requested(request) else None
+    try:
+        data = changes_since(request.user, visible_projects(request.user), since, users)
+    except TokenExpired:
+        return Response(
+            {'error': 'Change token expired; sync again without since'}, status=status.HTTP_410_GONE
+        )
+    if users is not None:
+        return Response(with_users(data, users, request))
+    return Response(data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch(request):
+    specs = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(specs, list) or not specs:
+        return Response({'error': 'requests must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(specs) > settings.BATCH_MAX_REQUESTS:
+        return Response(
+            {'error': f'At most {settings.BATCH_MAX_REQUESTS} requests per batch'}, status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        specs = [parse_spec(spec) for spec in specs]
+    except ValueError as error:
+        return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    responses = run_batch(request, specs)
+    if all(spec['method'] in SAFE_METHODS for spec in specs):
+        # Nothing was written, so ReadYourWritesMiddleware needn't pin.
+        request._request.skip_primary_pin = True
+    return Response({'responses': responses})
@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Requests mostly wait on the database, so a few threads per process keep
+# workers busy without the memory cost of more processes.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 12)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+if os.environ.get('TASKFLOW_SERVER') == 'uvicorn':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'taskflow.asgi:application'
+else:
+    worker_class = 'gthread'
+    wsgi_app = 'taskflow.wsgi:application'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks can't accumulate; the jitter
+# stops them all restarting at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 
@@ -6,7 +7,24 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'taskflow.settings')
 
-from django.core.management import execute_from_command_line
+
+def serve_production(asgi=False):
+    os.environ.setdefault('DJANGO_DEBUG', 'false')
+    if asgi:
+        os.environ['TASKFLOW_SERVER'] = 'uvicorn'
+    os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py'])
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('TASKFLOW_ENV') == 'production',
+                        help='Serve with gunicorn instead of the development server.')
+    parser.add_argument('--asgi', action='store_true', help='Use uvicorn workers (requires uvicorn).')
+    args = parser.parse_args()
+
+    if args.production:
+        serve_production(asgi=args.asgi)
+
+    from django.core.management import execute_from_command_line
     execute_from_command_line(['manage.py', 'runserver', '0.0.0.0:8000'])
@@ -0,0 +1,65 @@
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+    'pgsql': 'django.db.backends.postgresql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def parse_database_url(url, conn_max_age=600, sqlite_engine=None):
+    parts = urlsplit(url)
+    engine = ENGINES.get(parts.scheme.lower())
+    if engine is None:
+        raise ImproperlyConfigured(f'Unsupported database URL scheme {parts.scheme!r}')
+
+    if engine == 'django.db.backends.sqlite3':
+        engine = sqlite_engine or engine
+        # sqlite:///relative/path.db or sqlite:////absolute/path.db
+        name = unquote(parts.path[1:]) if parts.path.startswith('/') else unquote(parts.path)
+        if not name or name == ':memory:':
+            name = ':memory:'
+        return {'ENGINE': engine, 'NAME': name}
+
+    try:
+        port = parts.port
+    except ValueError:
+        raise ImproperlyConfigured(f'Invalid port in database URL for host {parts.hostname!r}')
+
+    options = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    host = parts.hostname or options.pop('host', '')
+    max_age = options.pop('conn_max_age', conn_max_age)
+    # pgbouncer in transaction mode can't keep server-side cursors open
+    # across transactions.
+    pgbouncer = options.pop('pgbouncer', '').lower() in TRUE_VALUES
+
+    name = unquote(parts.path.lstrip('/'))
+    if not name:
+        raise ImproperlyConfigured('Database URL is missing the database name')
+
+    return {
+        'ENGINE': engine,
+        'NAME': name,
+        'USER': unquote(parts.username or ''),
+        'PASSWORD': unquote(parts.password or ''),
+        'HOST': host,
+        'PORT': str(port) if port else '',
+        'CONN_MAX_AGE': None if str(max_age).lower() == 'none' else int(max_age),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': pgbouncer,
+        'OPTIONS': options,
+    }
+
+
+def replica_databases(urls, conn_max_age=600):
+    replicas = {}
+    for index, url in enumerate(url for url in urls.replace(',', ' ').split() if url):
+        config = parse_database_url(url, conn_max_age)
+        config['TEST'] = {'MIRROR': 'default'}
+        replicas[f'replica_{index}'] = config
+    return replicas
@@ -2,11 +2,13 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from .database import parse_database_url, replica_databases
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('SESSION_SECRET', 'django-insecure-taskflow-secret-key-change-in-production')
 
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', 'true').lower() in ('1', 'true', 'yes')
 
 ALLOWED_HOSTS = ['*']
 
@@ -19,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'api',
 ]
@@ -26,11 +29,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'api.middleware.ReadYourWritesMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -54,37 +60,62 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'taskflow.wsgi.application'
 
+# WAL, tuned pragmas and a single writer queue; see taskflow/sqlite3/base.py.
+SQLITE_ENGINE = 'taskflow.sqlite3' if os.environ.get('SQLITE_TUNED', 'true').lower() in ('1', 'true', 'yes') else 'django.db.backends.sqlite3'
+
 DATABASE_URL = os.environ.get('DATABASE_URL', '')
+DATABASE_REPLICA_URLS = os.environ.get('DATABASE_REPLICA_URLS', '')
 
 if DATABASE_URL:
-    import re
-    match = re.match(r'postgres(?:ql)?://([^:]+):([^@]+)@([^:/]+):(\d+)/(.+)', DATABASE_URL)
-    if match:
-        DATABASES = {
-            'default': {
-                'ENGINE': 'django.db.backends.postgresql',
-                'NAME': match.group(5),
-                'USER': match.group(1),
-                'PASSWORD': match.group(2),
-                'HOST': match.group(3),
-                'PORT': match.group(4),
-            }
-        }
-    else:
-        DATABASES = {
-            'default': {
-                'ENGINE': 'django.db.backends.sqlite3',
-                'NAME': BASE_DIR / 'db.sqlite3',
-            }
-        }
+    DATABASES = {'default': parse_database_url(DATABASE_URL, sqlite_engine=SQLITE_ENGINE)}
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            'ENGINE': SQLITE_ENGINE,
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
 
+DATABASES.update(replica_databases(DATABASE_REPLICA_URLS))
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
+# How long a user's reads stay on the primary after they write something.
+# Pins live in the default cache, so multi-process deployments with
+# replicas need REDIS_URL set for this to hold across workers.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 15))
+
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# The first hasher hashes new passwords; the rest only verify old hashes.
+# check_password() rehashes with the preferred one on the next successful
+# login. argon2 needs argon2-cffi and bcrypt needs bcrypt installed.
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'api.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 600000))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -109,11 +140,25 @@ AUTH_USER_MODEL = 'api.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.environ.get('LOGIN_RATE', '20/min'),
+        'login_email': os.environ.get('LOGIN_EMAIL_RATE', '10/min'),
+        'register': os.environ.get('REGISTER_RATE', '10/hour'),
+    },
 }
 
 SIMPLE_JWT = {
@@ -122,7 +167,42 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_REFRESH_SERIALIZER': 'api.tokens.TokenRefreshSerializer',
 }
 
+JWT_USER_CACHE_SECONDS = int(os.environ.get('JWT_USER_CACHE_SECONDS', 60))
+JWT_BLACKLIST_CACHE_SECONDS = int(os.environ.get('JWT_BLACKLIST_CACHE_SECONDS', 30))
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+# Requests running at least this many queries, and single queries at least
+# this slow, are logged with their SQL fingerprints.
+METRICS_QUERY_THRESHOLD = int(os.environ.get('METRICS_QUERY_THRESHOLD', 50))
+METRICS_SLOW_QUERY_MS = float(os.environ.get('METRICS_SLOW_QUERY_MS', 250))
+# /metrics answers scrapers presenting this bearer token, or, when unset,
+# only the listed addresses.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').replace(',', ' ').split()
+
+# /api/sync/ hands out journal entries in pages of SYNC_PAGE_SIZE, holding
+# back the last SYNC_LAG_SECONDS so late-committing writes aren't skipped.
+# prune_change_journal drops entries older than the retention window.
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+SYNC_LAG_SECONDS = int(os.environ.get('SYNC_LAG_SECONDS', 2))
+SYNC_JOURNAL_RETENTION_DAYS = int(os.environ.get('SYNC_JOURNAL_RETENTION_DAYS', 30))
+
+# /api/batch/ limits. Consecutive read-only sub-requests run on up to
+# BATCH_MAX_WORKERS threads, each with its own database connection; 1 runs
+# everything in order on the request thread. Opening a connection per thread
+# costs more than it saves on SQLite, so it defaults to 1 there.
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_MAX_WORKERS = int(os.environ.get(
+    'BATCH_MAX_WORKERS', 1 if 'sqlite' in DATABASES['default']['ENGINE'] else 4
+))
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
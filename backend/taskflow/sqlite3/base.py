@@ -0,0 +1,102 @@
+import re
+import threading
+
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+# SQLite only ever has one writer. Queueing writers on a per-file lock inside
+# the process means they wait their turn instead of spinning in SQLite's busy
+# handler, and transactions start with BEGIN IMMEDIATE so a reader can never
+# fail halfway through when it tries to upgrade to a write lock.
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def write_lock(name):
+    with _write_locks_guard:
+        return _write_locks.setdefault(str(name), threading.RLock())
+
+
+class SerializedCursorWrapper(base.SQLiteCursorWrapper):
+    write_lock = None
+
+    def execute(self, query, params=None):
+        if self.write_lock is None or self.connection.in_transaction or not WRITE_STATEMENT.match(query):
+            return super().execute(query, params)
+        with self.write_lock:
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        if self.write_lock is None or self.connection.in_transaction or not WRITE_STATEMENT.match(query):
+            return super().executemany(query, param_list)
+        with self.write_lock:
+            return super().executemany(query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # SQLite tuned for a single node: WAL journaling plus the pragmas in
+    # DEFAULT_PRAGMAS (override per key with OPTIONS['pragmas']), and writes
+    # serialized through a process-wide queue unless
+    # OPTIONS['serialize_writes'] is False.
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        serialize_writes = params.pop('serialize_writes', True)
+        self.write_lock = write_lock(params['database']) if serialize_writes else None
+        self.holds_write_lock = False
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SerializedCursorWrapper)
+        cursor.write_lock = self.write_lock
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        if self.write_lock is not None:
+            self.write_lock.acquire()
+            self.holds_write_lock = True
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if getattr(self, 'holds_write_lock', False):
+            self.holds_write_lock = False
+            self.write_lock.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
@@ -45,6 +45,7 @@ export function AuthProvider({ children }) {
   };
 
   const logout = () => {
+    authAPI.logout(localStorage.getItem('refresh_token')).catch(() => {});
     localStorage.removeItem('access_token');
     localStorage.removeItem('refresh_token');
     setUser(null);
@@ -24,10 +24,14 @@ export default function Calendar() {
 
   const fetchCalendarTasks = async () => {
     try {
-      const month = currentDate.getMonth() + 1;
-      const year = currentDate.getFullYear();
-      const response = await analyticsAPI.getCalendarTasks(month, year);
-      setTasks(response.data);
+      const response = await analyticsAPI.getCalendar({
+        view: 'month',
+        start: format(startOfMonth(currentDate), 'yyyy-MM-dd'),
+      });
+      const { days } = response.data;
+      setTasks(Object.entries(days).flatMap(([dueDate, dayTasks]) =>
+        dayTasks.map((task) => ({ ...task, due_date: dueDate }))
+      ));
     } catch (error) {
       console.error('Failed to fetch calendar tasks:', error);
     } finally {
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { DragDropContext, Droppable, Draggable } from '@hello-pangea/dnd';
-import { tasksAPI, projectsAPI, analyticsAPI } from '../services/api';
+import { tasksAPI, analyticsAPI, batchAPI } from '../services/api';
 import {
   Plus,
   Circle,
@@ -39,38 +39,49 @@ export default function KanbanBoard() {
   });
 
   useEffect(() => {
-    fetchTasks();
-    fetchProjects();
+    fetchBoard();
   }, []);
 
-  const fetchTasks = async () => {
+  const groupTasks = (taskList) => {
+    const grouped = {
+      todo: [],
+      in_progress: [],
+      review: [],
+      done: [],
+    };
+    taskList.forEach((task) => {
+      if (grouped[task.status]) {
+        grouped[task.status].push(task);
+      }
+    });
+    return grouped;
+  };
+
+  const fetchBoard = async () => {
     try {
-      const response = await tasksAPI.list();
-      const grouped = {
-        todo: [],
-        in_progress: [],
-        review: [],
-        done: [],
-      };
-      response.data.forEach((task) => {
-        if (grouped[task.status]) {
-          grouped[task.status].push(task);
-        }
-      });
-      setTasks(grouped);
+      const [tasksResponse, projectsResponse] = await batchAPI.run([
+        { path: '/tasks/' },
+        { path: '/projects/' },
+      ]);
+      if (tasksResponse.status === 200) {
+        setTasks(groupTasks(tasksResponse.body));
+      }
+      if (projectsResponse.status === 200) {
+        setProjects(projectsResponse.body);
+      }
     } catch (error) {
-      console.error('Failed to fetch tasks:', error);
+      console.error('Failed to fetch board:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchProjects = async () => {
+  const fetchTasks = async () => {
     try {
-      const response = await projectsAPI.list();
-      setProjects(response.data);
+      const response = await tasksAPI.list();
+      setTasks(groupTasks(response.data));
     } catch (error) {
-      console.error('Failed to fetch projects:', error);
+      console.error('Failed to fetch tasks:', error);
     }
   };
 
@@ -99,7 +110,14 @@ export default function KanbanBoard() {
     });
 
     try {
-      await tasksAPI.move(taskId, { status: newStatus, order: destination.index });
+      // A 409 means someone else moved or edited the task first; the catch
+      // below reloads the board.
+      const response = await tasksAPI.move(taskId, {
+        status: newStatus,
+        order: destination.index,
+        version: removed.version,
+      });
+      removed.version = response.data.version;
       await analyticsAPI.logEvent({
         task: taskId,
         event_type: 'status_drag_drop',
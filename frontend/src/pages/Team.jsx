@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { projectsAPI, analyticsAPI } from '../services/api';
+import { projectsAPI, analyticsAPI, batchAPI } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import {
   Users,
@@ -28,27 +28,36 @@ export default function Team() {
   const [memberLoading, setMemberLoading] = useState(false);
 
   useEffect(() => {
-    fetchTeamStats();
-    fetchProjects();
+    fetchPage();
   }, []);
 
-  const fetchTeamStats = async () => {
+  const fetchPage = async () => {
     try {
-      const response = await analyticsAPI.getTeamStats();
-      setTeamData(response.data);
+      const [statsResponse, projectsResponse] = await batchAPI.run([
+        { path: '/team/stats/' },
+        { path: '/projects/' },
+      ]);
+      if (statsResponse.status === 200) {
+        setTeamData(statsResponse.body);
+      }
+      if (projectsResponse.status === 200) {
+        setProjects(projectsResponse.body);
+      }
     } catch (error) {
-      console.error('Failed to fetch team stats:', error);
+      console.error('Failed to fetch team page:', error);
     } finally {
       setLoading(false);
     }
   };
 
-  const fetchProjects = async () => {
+  const fetchTeamStats = async () => {
     try {
-      const response = await projectsAPI.list();
-      setProjects(response.data);
+      const response = await analyticsAPI.getTeamStats();
+      setTeamData(response.data);
     } catch (error) {
-      console.error('Failed to fetch projects:', error);
+      console.error('Failed to fetch team stats:', error);
+    } finally {
+      setLoading(false);
     }
   };
 
@@ -46,6 +46,7 @@ api.interceptors.response.use(
 export const authAPI = {
   register: (data) => api.post('/auth/register/', data),
   login: (data) => api.post('/auth/login/', data),
+  logout: (refresh) => api.post('/auth/logout/', { refresh }),
   getProfile: () => api.get('/users/me/'),
   updateProfile: (data) => api.put('/users/me/', data),
 };
@@ -60,6 +61,7 @@ export const projectsAPI = {
   getBacklog: (id) => api.get(`/projects/${id}/backlog/`),
   getMembers: (id) => api.get(`/projects/${id}/members/`),
   addMember: (id, data) => api.post(`/projects/${id}/add_member/`, data),
+  addMembers: (id, data) => api.post(`/projects/${id}/add_members/`, data),
 };
 
 export const tasksAPI = {
@@ -70,6 +72,8 @@ export const tasksAPI = {
   patch: (id, data) => api.patch(`/tasks/${id}/`, data),
   delete: (id) => api.delete(`/tasks/${id}/`),
   move: (id, data) => api.post(`/tasks/${id}/move/`, data),
+  tree: (id) => api.get(`/tasks/${id}/tree/`),
+  timeline: (id, params) => api.get(`/tasks/${id}/timeline/`, { params }),
 };
 
 export const sprintsAPI = {
@@ -96,6 +100,22 @@ export const timeEntriesAPI = {
   delete: (id) => api.delete(`/time-entries/${id}/`),
 };
 
+export const attachmentsAPI = {
+  list: (task) => api.get('/attachments/', { params: { task } }),
+  upload: (task, file) => {
+    const data = new FormData();
+    data.append('task', task);
+    data.append('file', file);
+    return api.post('/attachments/', data);
+  },
+  startUpload: (data) => api.post('/attachments/uploads/', data),
+  uploadStatus: (id) => api.get(`/attachments/uploads/${id}/`),
+  uploadChunk: (id, offset, chunk) => api.patch(`/attachments/uploads/${id}/`, chunk, {
+    headers: { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset) },
+  }),
+  delete: (id) => api.delete(`/attachments/${id}/`),
+};
+
 export const notificationsAPI = {
   list: () => api.get('/notifications/'),
   markRead: (id) => api.patch(`/notifications/${id}/`, { is_read: true }),
@@ -106,12 +126,31 @@ export const analyticsAPI = {
   logEvent: (data) => api.post('/analytics/events/', data),
   getDashboardStats: () => api.get('/dashboard/stats/'),
   getAnalyticsData: (days = 7) => api.get('/analytics/data/', { params: { days } }),
+  getProductivityProfile: (user) => api.get('/analytics/profile/', { params: { user } }),
+  getCycleTime: (project, days = 90) => api.get('/analytics/cycle-time/', { params: { project, days } }),
   getCalendarTasks: (month, year) => api.get('/calendar/tasks/', { params: { month, year } }),
+  getCalendar: (params) => api.get('/calendar/tasks/', { params }),
   getTeamStats: () => api.get('/team/stats/'),
 };
 
 export const usersAPI = {
-  list: () => api.get('/users/'),
+  list: (params) => api.get('/users/', { params }),
+  search: (search, project) => api.get('/users/', { params: { search, project } }),
+  lookup: (ids) => api.get('/users/', { params: { ids: ids.join(',') } }),
+};
+
+export const syncAPI = {
+  // Omit since for a full snapshot; a 410 means the token expired and the
+  // client should take a new one.
+  changes: (since) => api.get('/sync/', { params: since ? { since } : {} }),
+};
+
+export const batchAPI = {
+  // Several calls in one round trip. Paths are relative to the API root, as
+  // with the helpers above; resolves to one { status, body } per request.
+  run: (requests) => api.post('/batch/', {
+    requests: requests.map((request) => ({ ...request, path: `${API_URL}${request.path}` })),
+  }).then((response) => response.data.responses),
 };
 
 export default api;
@@ -1,6 +1,10 @@
 #!/bin/bash
 
-cd backend && python manage.py runserver 0.0.0.0:8000 &
+if [ "$TASKFLOW_ENV" = "production" ]; then
+  (cd backend && python run.py --production) &
+else
+  (cd backend && python manage.py runserver 0.0.0.0:8000) &
+fi
 BACKEND_PID=$!
 
 cd frontend && npm run dev &